@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Fixture check and micro benchmark of counters parsing, it prints cost of one counter:
+    python benchmarks/counters.py --counters 10000
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+from selenium_parsers.utils.counters import find_counter, parse_counter, parse_counters
+
+# texts of counters as networks render them and expected values, None is text without counter
+COUNTERS_FIXTURE: List[Tuple[Optional[str], Optional[int]]] = [
+    # plain numbers
+    ('0', 0),
+    ('7', 7),
+    ('42', 42),
+    ('999', 999),
+    ('1000', 1000),
+    ('123456789', 123456789),
+    # digits groups
+    ('1 234', 1234),
+    ('12 345 678', 12345678),
+    ('1\xa0234', 1234),
+    ('1\u202f234', 1234),
+    ('1&nbsp;234', 1234),
+    ('12,345', 12345),
+    ('1.234', 1234),
+    # facebook
+    (': 5', 5),
+    (' 17', 17),
+    ('1,2 тыс.', 1200),
+    ('1,2\xa0тыс.', 1200),
+    ('12 тыс.', 12000),
+    ('4,35 тыс.', 4350),
+    ('5 тысяч', 5000),
+    ('1 тысяча', 1000),
+    ('2 тысячи', 2000),
+    ('3,7 млн.', 3700000),
+    ('15 млн', 15000000),
+    ('1 миллион', 1000000),
+    ('2 миллиона', 2000000),
+    ('10 миллионов', 10000000),
+    ('1,1 млрд', 1100000000),
+    # tiktok
+    ('1.2K', 1200),
+    ('12.5K', 12500),
+    ('980', 980),
+    ('1.5M', 1500000),
+    ('3M', 3000000),
+    ('1.1B', 1100000000),
+    ('2k', 2000),
+    ('4,1 К', 4100),
+    ('7,5 М', 7500000),
+    # odnoklassniki
+    ('3&nbsp;просмотра', 3),
+    ('125&nbsp;просмотров', 125),
+    ('1 234 просмотра', 1234),
+    ('1,2&nbsp;тыс.&nbsp;просмотров', 1200),
+    ('5 комментариев', 5),
+    # texts without counter
+    ('', None),
+    ('просмотров', None),
+    ('Вы и ещё 5', None),
+    ('тыс.', None),
+    (None, None),
+    # broken digits groups
+    ('12 3456', None),
+    ('1 2345 просмотров', None),
+]
+
+# labels of facebook page counters, counter is inside of text
+LABELS_FIXTURE: List[Tuple[str, int]] = [
+    ('Нравится 12 345 людям', 12345),
+    ('Нравится 1,2 тыс. людям', 1200),
+    ('Подписаны 3,4 млн человек', 3400000),
+    ('1 234 человека подписаны', 1234),
+    ('Всего подписчиков: 98 765', 98765),
+]
+
+
+def check_fixture() -> None:
+    texts = [text for text, _ in COUNTERS_FIXTURE]
+    for (text, expected), counter in zip(COUNTERS_FIXTURE, parse_counters(texts)):
+        assert counter == expected, f'{text!r}: {counter} != {expected}'
+    for text, expected in LABELS_FIXTURE:
+        counter = find_counter(text)
+        assert counter == expected, f'{text!r}: {counter} != {expected}'
+    print(f'{len(COUNTERS_FIXTURE) + len(LABELS_FIXTURE)} counters of fixture are parsed correctly')
+
+
+def get_counters_texts(counters: int) -> List[str]:
+    """
+    Return unique counters texts of all formats
+    """
+    formats = ('{} тыс.', '{},{} тыс.', '{}.{}K', '{}&nbsp;просмотров', '{} {:03d}', '{}')
+    texts = []
+    for i in range(counters):
+        text_format = formats[i % len(formats)]
+        texts.append(text_format.format(i // len(formats) + 1, i % 10))
+    return texts
+
+
+def main(counters: int, repeat: int) -> None:
+    check_fixture()
+    texts = get_counters_texts(counters)
+    best = float('inf')
+    for _ in range(repeat):
+        parse_counter.cache_clear()
+        start = time.perf_counter()
+        parse_counters(texts)
+        best = min(best, time.perf_counter() - start)
+    print(f'{"parse_counters, cold cache":<32} {best / counters * 10 ** 6:10.2f} us/counter')
+
+    # counters of the same posts are parsed again by incremental crawls
+    cached_texts = texts[:parse_counter.cache_info().maxsize]
+    parse_counters(cached_texts)
+    start = time.perf_counter()
+    parse_counters(cached_texts)
+    elapsed = time.perf_counter() - start
+    print(f'{"parse_counters, warm cache":<32} {elapsed / len(cached_texts) * 10 ** 6:10.2f} us/counter')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark of counters parsing')
+    arg_parser.add_argument('--counters', type=int, default=10000, help='count of counters texts')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='best of repeats is printed')
+    args = arg_parser.parse_args()
+    main(args.counters, args.repeat)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro benchmark of facebook posts date parsing, it prints cost of one post:
+    python benchmarks/dates.py --posts 1200
+"""
+import argparse
+import datetime
+import locale
+import time
+from typing import Callable, List
+
+from selenium_parsers.utils.dates import DATEPARSER_FORMATS, parse_date, parse_russian_date
+
+WEEKDAYS = ('Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье')
+MONTHS = (
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря',
+)
+
+
+def get_date_titles(posts: int) -> List[str]:
+    """
+    Return titles of posts published every 3 hours, like facebook renders them
+    """
+    start = datetime.datetime(2020, 5, 1, 12, 30)
+    titles = []
+    for i in range(posts):
+        date = start - datetime.timedelta(hours=3 * i)
+        titles.append(
+            f'{WEEKDAYS[date.weekday()]}, {date.day} {MONTHS[date.month - 1]} {date.year} г. '
+            f'в {date.hour}:{date.minute:02d}'
+        )
+    return titles
+
+
+def parse_by_dateparser(title: str) -> datetime.datetime:
+    """
+    Parsing of posts date before utils/dates.py
+    """
+    import dateparser
+    try:
+        locale.setlocale(locale.LC_TIME, 'ru_RU.UTF-8')
+    except locale.Error:
+        pass
+    return dateparser.parse(title, date_formats=DATEPARSER_FORMATS, languages=['ru'])
+
+
+def measure(name: str, parse: Callable[[str], datetime.datetime], titles: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        parse_russian_date.cache_clear()
+        start = time.perf_counter()
+        for title in titles:
+            parse(title)
+        best = min(best, time.perf_counter() - start)
+    per_post = best / len(titles) * 10 ** 6
+    print(f'{name:<32} {per_post:10.2f} us/post')
+    return per_post
+
+
+def main(posts: int, repeat: int, with_dateparser: bool) -> None:
+    titles = get_date_titles(posts)
+    for title in titles:
+        assert parse_russian_date(title) is not None, title
+
+    measure('parse_date, cold cache', parse_date, titles, repeat)
+    # the same posts are parsed again by incremental crawls and reparse
+    parse_russian_date.cache_clear()
+    for title in titles:
+        parse_date(title)
+    start = time.perf_counter()
+    for title in titles:
+        parse_date(title)
+    print(f'{"parse_date, warm cache":<32} {(time.perf_counter() - start) / posts * 10 ** 6:10.2f} us/post')
+    measure('parse_date, utime', lambda title: parse_date(None, 1588325400), titles, repeat)
+
+    if with_dateparser:
+        start = time.perf_counter()
+        import dateparser
+        print(f'{"dateparser import":<32} {(time.perf_counter() - start) * 1000:10.2f} ms')
+        measure(
+            'dateparser',
+            lambda title: dateparser.parse(title, date_formats=DATEPARSER_FORMATS, languages=['ru']),
+            titles[:200],
+            1
+        )
+        measure('dateparser with locale', parse_by_dateparser, titles[:200], 1)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark of posts date parsing')
+    arg_parser.add_argument('--posts', type=int, default=1200, help='count of posts dates')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='best of repeats is printed')
+    arg_parser.add_argument('--without-dateparser', action='store_true', help='do not measure dateparser')
+    args = arg_parser.parse_args()
+    main(args.posts, args.repeat, not args.without_dateparser)
@@ -1,3 +1,9 @@
 #!/bin/sh
+# proxies status is cached for drivers startup
+python utils/proxy_health.py &
 python worker/run.py &
-/usr/sbin/crond -f -l 8
+WORKER_PID=$!
+# let the worker finish current messages on container stop
+trap 'kill -TERM $WORKER_PID; wait $WORKER_PID; exit 0' TERM INT
+/usr/sbin/crond -f -l 8 &
+wait $!
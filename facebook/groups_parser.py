@@ -1,34 +1,44 @@
 #!/usr/bin python
+import argparse
 import datetime
 import logging
 import os
 import random
 import string
-from time import sleep
-from typing import List, TYPE_CHECKING
+import time
+from functools import partial
+from typing import Dict, List, Optional, TYPE_CHECKING, Tuple
 
 import pymongo
 from selenium.common.exceptions import NoSuchElementException
 
 from selenium_parsers.facebook.facebook_logger import setup_fb_logger
-from selenium_parsers.facebook.utils.database import get_facebook_proxy
-from selenium_parsers.facebook.utils.general import FacebookParseError
+from selenium_parsers.facebook.utils.crawl_state import get_crawl_state, get_new_posts, get_posts_window, \
+    save_crawl_state
+from selenium_parsers.facebook.utils.database import take_facebook_proxies
+from selenium_parsers.facebook.utils.general import FacebookParseError, FacebookPostParseError
 from selenium_parsers.facebook.utils.page import get_display_name, get_club_id, get_club_icon, \
-    get_members_and_page_like_count, get_post_parent_selector, scroll_while_loading, extract_posts, \
+    get_members_and_page_like_count, get_cached_post_parent_selector, scroll_while_loading, \
     close_unauthorized_popup, transform_link_to_russian
-from selenium_parsers.facebook.utils.post import get_post_short_text, generate_post_id, get_likes_count, \
-    get_actions_count, get_post_img, get_post_date
-from selenium_parsers.utils.constants import FACEBOOK_SCREENSHOTS_DIR, DEBUG, USE_PROXY, FACEBOOK_PID_PATH
+from selenium_parsers.facebook.utils.post import build_post_data, extract_posts_data
+from selenium_parsers.facebook.utils.post_history import ensure_history_index, get_club_totals, \
+    save_counters_history
+from selenium_parsers.utils.constants import FACEBOOK_SCREENSHOTS_DIR, DEBUG, USE_PROXY, FACEBOOK_PID_PATH, \
+    FACEBOOK_REFRESH_WINDOW_HOURS, FACEBOOK_SHARDS, FACEBOOK_DEBUGGING_PORT
 from selenium_parsers.utils.database import get_selenium_links
 from selenium_parsers.utils.general import create_chrome_driver
-from selenium_parsers.utils.mongo_models import FacebookPageData, FacebookPostData
+from selenium_parsers.utils.mongo_models import FacebookPageData, FacebookPostData, bulk_upsert, \
+    ensure_unique_index
 from selenium_parsers.utils.parsers_signals import setup_signals_handlers, \
     process_terminate
+from selenium_parsers.utils.recycling import DriverRecycler
+from selenium_parsers.utils.sharding import get_shard_pid_path, run_shards
+from selenium_parsers.utils.snapshots import get_snapshot_archive
+from selenium_parsers.utils.waits import open_page
 
 if TYPE_CHECKING:
     from pymongo.database import Database
     from selenium.webdriver.chrome.webdriver import WebDriver
-    from selenium.webdriver.remote.webelement import WebElement
 
 
 logger = logging.getLogger('facebook_parser')
@@ -37,35 +47,17 @@ logger.info(f'DEBUG {DEBUG}')
 logger.info(f'SCREENSHOTS_DIR {FACEBOOK_SCREENSHOTS_DIR}')
 
 
-def parse_post(post: 'WebElement', club_id: str) -> FacebookPostData:
+def parse_post(raw_post: dict, club_id: str) -> FacebookPostData:
     """
-    Parse facebook post data
+    Build facebook post data from raw data of posts extractor
     """
-    post_short_text = get_post_short_text(post)
     try:
-        post_id = generate_post_id(post_short_text)
-
-        likes_count = get_likes_count(post)
-        comments_cnt = get_actions_count(post, post_short_text, 'Комментарии')
-        shares_cnt = get_actions_count(post, post_short_text, 'Поделились')
-
-        image_link = get_post_img(post)
-        post_date = get_post_date(post)
-        post_data = {
-            'club_id': club_id,
-            'post_id': post_id,
-            'post_img': image_link,
-            'content': post_short_text,
-            'comments_count': comments_cnt,
-            'shares_count': shares_cnt,
-            'likes_count': likes_count,
-            'datetime': post_date,
-            'parse_datetime': datetime.datetime.now(),
-        }
-        return FacebookPostData(post_data)
-    except NoSuchElementException:
-        logger.error(f'can not parse post - {post_short_text}', exc_info=True)
+        post_data = build_post_data(raw_post, club_id)
+    except FacebookPostParseError:
+        logger.error(f'can not parse post - {raw_post["text"][:100]}', exc_info=True)
         raise
+    post_data['parse_datetime'] = datetime.datetime.now()
+    return FacebookPostData(post_data)
 
 
 def set_cookies(driver: 'WebDriver', cookies: List[dict]) -> None:
@@ -76,16 +68,39 @@ def set_cookies(driver: 'WebDriver', cookies: List[dict]) -> None:
         driver.add_cookie(cookie)
 
 
-def main(driver: 'WebDriver', facebook_pages: List[str], database: 'Database') -> None:
+def main(
+        recycler: DriverRecycler,
+        facebook_pages: List[str],
+        database: 'Database',
+        full_crawl: bool = False
+) -> Dict[str, int]:
     """
-    Parse all facebook groups from database, save result to mongodb
+    Parse facebook groups, save result to mongodb and return parsing stats.
+    Clubs crawled before are parsed incrementally: only posts of the refresh window are updated,
+    full crawl scrolls every club to the end
     """
     facebook_pages_data = database['facebook_pages_data']
     facebook_posts_data = database['facebook_posts_data']
+    facebook_selectors = database['facebook_selectors']
+    facebook_crawl_state = database['facebook_crawl_state']
+    facebook_posts_history = database['facebook_posts_history']
+    ensure_unique_index(
+        facebook_posts_data, FacebookPostData.unique_key, logger, FacebookPostData.unique_filter
+    )
+    ensure_history_index(facebook_posts_history)
 
-    driver.get('https://facebook.com')
+    archive = get_snapshot_archive()
+    if archive:
+        logger.info(f'{archive.enforce_retention()} old snapshots were removed')
+
+    recycler.driver.get('https://facebook.com')
     parsed_pages = 0
+    parsed_posts = 0
+    inserted_posts = 0
+    updated_posts = 0
     for link in facebook_pages:
+        # driver could be restarted after the previous page
+        driver = recycler.driver
         link = link.rstrip()
         logger.info(f'starting to parse {link}')
         url_name = link.split('/')[-1]
@@ -95,102 +110,169 @@ def main(driver: 'WebDriver', facebook_pages: List[str], database: 'Database') -
         page_posts_link = f'{link}/posts/'
 
         ru_page_posts_link = transform_link_to_russian(page_posts_link)
-        driver.get(ru_page_posts_link)
-        sleep(2)
+        open_page(driver, ru_page_posts_link, 'facebook', logger)
 
         close_unauthorized_popup(driver)
+        page_meta = {'club_link': source_link, 'url': ru_page_posts_link}
         try:
             display_name = get_display_name(driver) or url_name
             club_id = get_club_id(driver) or url_name
             club_icon = get_club_icon(driver, club_id)
 
             members_cnt, page_likes_cnt = get_members_and_page_like_count(driver, driver.current_url)
+            # counters are parsed from other pages, snapshot of posts page does not contain them
+            page_meta.update(subscribers_count=members_cnt, page_likes=page_likes_cnt)
+
+            crawl_state = get_crawl_state(facebook_crawl_state, source_link)
+            is_incremental = not full_crawl and crawl_state is not None
+            min_utime = int(time.time() - FACEBOOK_REFRESH_WINDOW_HOURS * 60 * 60) if is_incremental else None
 
-            posts_selector = get_post_parent_selector(driver)
+            posts_selector = get_cached_post_parent_selector(driver, facebook_selectors, source_link)
             scroll_while_loading(
                 driver,
                 posts_selector,
                 trigger=close_unauthorized_popup,
-                trigger_kwargs={'driver': driver}
+                trigger_kwargs={'driver': driver},
+                min_utime=min_utime
+            )
+            extraction_start = time.monotonic()
+            raw_posts = extract_posts_data(driver, posts_selector, min_utime)
+            logger.info(
+                f'{len(raw_posts)} posts were extracted in {time.monotonic() - extraction_start:.2f}s, '
+                f'{"incremental" if is_incremental else "full"} crawl'
             )
-            posts = extract_posts(driver, posts_selector)
 
             total_posts_counter: int = 0
-            total_likes_counter: int = 0
-            total_comments_counter: int = 0
-            total_shares_counter: int = 0
-            for i, post in enumerate(posts, start=1):
+            parsed_raw_posts = []
+            post_ids = []
+            fb_posts = []
+            for raw_post in raw_posts:
                 try:
-                    fb_post_obj = parse_post(post, club_id)
-                except NoSuchElementException:
+                    fb_post_obj = parse_post(raw_post, club_id)
+                except FacebookPostParseError:
                     continue
-
-                fb_post_obj.save(collection=facebook_posts_data)
-
-                likes_count = fb_post_obj.likes_count
-                comments_cnt = fb_post_obj.comments_count
-                shares_cnt = fb_post_obj.shares_count
-
+                parsed_raw_posts.append(raw_post)
+                post_ids.append(fb_post_obj.post_id)
+                fb_posts.append(fb_post_obj)
                 total_posts_counter += 1
-                total_likes_counter += likes_count
-                total_comments_counter += comments_cnt
-                total_shares_counter += shares_cnt
 
+            samples = save_counters_history(facebook_posts_data, facebook_posts_history, club_id, fb_posts)
+            upsert_result = bulk_upsert(facebook_posts_data, fb_posts, FacebookPostData.unique_key)
+            logger.info(
+                f'{upsert_result.inserted} posts were inserted, {upsert_result.updated} updated, '
+                f'{samples} posts changed counters'
+            )
+            parsed_posts += total_posts_counter
+            inserted_posts += upsert_result.inserted
+            updated_posts += upsert_result.updated
+            # incremental crawl loads posts of refresh window only, club totals are summed over saved posts
             page_data = {
                 'club_id': club_id,
                 'club_link': source_link,
-                'posts_count': total_posts_counter,
                 'subscribers_count': members_cnt,
                 'club_img': club_icon,
                 'club_display_name': display_name,
                 'datetime': datetime.datetime.now(),
                 'page_likes': page_likes_cnt,
-                'posts_likes': total_likes_counter,
-                'comments_count': total_comments_counter,
-                'shares_count': total_shares_counter,
+                'crawl_mode': 'incremental' if is_incremental else 'full',
+                **get_club_totals(facebook_posts_data, club_id),
             }
             facebook_data = FacebookPageData(page_data)
             facebook_data.save(facebook_pages_data)
+
+            posts_window = get_posts_window(parsed_raw_posts, post_ids)
+            if crawl_state:
+                new_posts = get_new_posts(crawl_state, posts_window)
+                logger.info(f'{len(new_posts)} new posts since the previous crawl of {source_link}')
+            save_crawl_state(facebook_crawl_state, source_link, posts_window, is_full_crawl=not is_incremental)
         except (FacebookParseError, NoSuchElementException):
             logger.error(f'cant parse facebook page {link}', exc_info=True)
             code = ''.join(random.choice(string.hexdigits) for _ in range(5))
             logger.error(f'incident code: {code}', exc_info=True)
             screen_path = os.path.join(FACEBOOK_SCREENSHOTS_DIR, f'facebook_screenshot_{code}.png')
-            chrom_driver.save_screenshot(screen_path)
+            driver.save_screenshot(screen_path)
         else:
             parsed_pages += 1
+        if archive:
+            archive.save('facebook', driver.page_source, page_meta)
+        recycler.page_done()
 
     logger.info(
         f'facebook parsing is finish, {parsed_pages} - pages was parsed, '
-        f'total pages: {len(facebook_links)}'
+        f'total pages: {len(facebook_pages)}, posts inserted: {inserted_posts}, updated: {updated_posts}'
     )
+    return {
+        'pages': len(facebook_pages),
+        'parsed_pages': parsed_pages,
+        'posts': parsed_posts,
+        'inserted_posts': inserted_posts,
+        'updated_posts': updated_posts,
+    }
 
 
-if __name__ == '__main__':
-    setup_signals_handlers(process_terminate)
-    setup_fb_logger()
-    facebook_links = get_selenium_links(
-        column_name='page_link',
-        table_name='api_facebookpage'
-    )
+def run_shard(
+        shard_id: int,
+        facebook_pages: List[str],
+        full_crawl: bool = False,
+        proxies: Optional[List[Tuple[str, str]]] = None
+) -> Dict[str, int]:
+    """
+    Parse facebook groups of one shard by its own driver, proxy and mongo connection,
+    proxies are taken by the runner, every shard gets its own one while there are enough of them
+    """
     extra_params = {}
-    if USE_PROXY:
-        proxy_ip, proxy_port = get_facebook_proxy()
+    if proxies:
+        proxy_ip, proxy_port = proxies[shard_id % len(proxies)]
         extra_params = {
             'proxy_ip': proxy_ip,
             'proxy_port': proxy_port
         }
 
-    chrom_driver = create_chrome_driver(
-        pid_file_path=FACEBOOK_PID_PATH,
-        logger=logger,
-        headless=(not DEBUG),
-        **extra_params
+    driver_recycler = DriverRecycler(
+        partial(
+            create_chrome_driver,
+            pid_file_path=get_shard_pid_path(FACEBOOK_PID_PATH, shard_id),
+            logger=logger,
+            headless=(not DEBUG),
+            debugging_port=FACEBOOK_DEBUGGING_PORT + shard_id,
+            blocking_profile='facebook',
+            **extra_params
+        ),
+        logger
     )
+    driver_recycler.start()
     try:
         with pymongo.MongoClient('mongodb://mongo', 27017) as mongo_client:
             mongo_db = mongo_client['owl_project']
-            main(chrom_driver, facebook_links, mongo_db)
+            return main(driver_recycler, facebook_pages, mongo_db, full_crawl=full_crawl)
     except Exception:
-        chrom_driver.close()
+        driver_recycler.quit()
         raise
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Parse facebook clubs')
+    arg_parser.add_argument('--full', action='store_true', help='scroll every club to the end')
+    args = arg_parser.parse_args()
+
+    setup_signals_handlers(process_terminate)
+    setup_fb_logger()
+    facebook_links = get_selenium_links(
+        column_name='page_link',
+        table_name='api_facebookpage'
+    )
+    shards_proxies = []
+    if USE_PROXY:
+        shards_proxies = take_facebook_proxies(FACEBOOK_SHARDS)
+        if not shards_proxies:
+            logger.critical('there are no free facebook proxies')
+            exit(-1)
+        if len(shards_proxies) < FACEBOOK_SHARDS:
+            logger.warning(f'{len(shards_proxies)} facebook proxies are shared by {FACEBOOK_SHARDS} shards')
+    run_shards(
+        partial(run_shard, full_crawl=args.full, proxies=shards_proxies),
+        facebook_links,
+        FACEBOOK_SHARDS,
+        FACEBOOK_PID_PATH,
+        logger
+    )
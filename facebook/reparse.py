@@ -0,0 +1,105 @@
+#!/usr/bin python
+"""
+Parse archived facebook pages again without browser, it is used for backfills after selectors fix:
+    python facebook/reparse.py --days 3
+"""
+import argparse
+import datetime
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import pymongo
+
+from selenium_parsers.facebook.facebook_logger import setup_fb_logger
+from selenium_parsers.facebook.groups_parser import parse_post
+from selenium_parsers.facebook.utils.general import FacebookParseError, FacebookPostParseError
+from selenium_parsers.facebook.utils.offline import parse_html, get_post_parent_selector, extract_posts_data, \
+    get_display_name, get_club_id, get_club_icon
+from selenium_parsers.facebook.utils.post_history import get_club_totals
+from selenium_parsers.utils.mongo_models import FacebookPageData, FacebookPostData, bulk_upsert, \
+    ensure_unique_index
+from selenium_parsers.utils.snapshots import SnapshotArchive, get_snapshot_archive
+
+if TYPE_CHECKING:
+    from pymongo.database import Database
+
+logger = logging.getLogger('facebook_parser')
+
+DAY = 24 * 60 * 60
+
+
+def reparse_snapshot(archive: SnapshotArchive, meta: dict, database: 'Database', dry_run: bool) -> int:
+    """
+    Parse page snapshot and save its page and posts data, return count of parsed posts
+    """
+    tree = parse_html(archive.load('facebook', meta['sha']))
+    source_link = meta['club_link']
+    url_name = source_link.rstrip().split('/')[-1]
+    club_id = get_club_id(tree) or url_name
+    parse_datetime = datetime.datetime.fromtimestamp(meta['saved'])
+
+    posts_selector = get_post_parent_selector(tree)
+    posts = []
+    for raw_post in extract_posts_data(tree, posts_selector):
+        try:
+            fb_post_obj = parse_post(raw_post, club_id)
+        except FacebookPostParseError:
+            continue
+        fb_post_obj.parse_datetime = parse_datetime
+        posts.append(fb_post_obj)
+    logger.info(f'{len(posts)} posts were parsed from snapshot {meta["sha"]} of {source_link}')
+    if dry_run:
+        return len(posts)
+
+    upsert_result = bulk_upsert(database['facebook_posts_data'], posts, FacebookPostData.unique_key)
+    logger.info(f'{upsert_result.inserted} posts were inserted, {upsert_result.updated} updated')
+
+    if 'subscribers_count' not in meta:
+        logger.warning(f'page counters of {source_link} were not crawled, page data is not saved')
+        return len(posts)
+    page_data = {
+        'club_id': club_id,
+        'club_link': source_link,
+        'subscribers_count': meta['subscribers_count'],
+        'club_img': get_club_icon(tree),
+        'club_display_name': get_display_name(tree) or url_name,
+        'datetime': parse_datetime,
+        'page_likes': meta['page_likes'],
+        **get_club_totals(database['facebook_posts_data'], club_id),
+    }
+    FacebookPageData(page_data).save(database['facebook_pages_data'])
+    return len(posts)
+
+
+def main(archive: SnapshotArchive, since: float, database: 'Database', dry_run: bool) -> None:
+    start = time.monotonic()
+    snapshots = 0
+    posts = 0
+    if not dry_run:
+        ensure_unique_index(
+            database['facebook_posts_data'], FacebookPostData.unique_key, logger, FacebookPostData.unique_filter
+        )
+    for meta in archive.iter_meta('facebook', since=since):
+        try:
+            posts += reparse_snapshot(archive, meta, database, dry_run)
+        except FacebookParseError:
+            logger.error(f'can not parse snapshot {meta["sha"]} of {meta["club_link"]}', exc_info=True)
+        else:
+            snapshots += 1
+    logger.info(f'{snapshots} snapshots, {posts} posts were parsed in {time.monotonic() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Parse archived facebook pages')
+    arg_parser.add_argument('--days', type=float, default=1, help='parse snapshots of the last days')
+    arg_parser.add_argument('--dry-run', action='store_true', help='parse and log counts, do not save')
+    args = arg_parser.parse_args()
+
+    setup_fb_logger()
+    snapshot_archive = get_snapshot_archive()
+    if snapshot_archive is None:
+        logger.critical('SNAPSHOTS_DIR is not set')
+        exit(-1)
+    with pymongo.MongoClient('mongodb://mongo', 27017) as mongo_client:
+        main(snapshot_archive, time.time() - args.days * DAY, mongo_client['owl_project'], args.dry_run)
@@ -0,0 +1,56 @@
+"""
+Crawl state of facebook clubs: incremental crawl refreshes only posts of the last hours,
+the state keeps newest post time and posts of the refresh window found by the previous run
+"""
+import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from pymongo.collection import Collection
+
+
+def get_crawl_state(collection: 'Collection', club_link: str) -> Optional[dict]:
+    return collection.find_one({'club_link': club_link})
+
+
+def get_new_posts(crawl_state: dict, posts_window: Dict[str, int]) -> List[str]:
+    """
+    Return ids of posts published after the newest post of the previous crawl
+    """
+    newest_utime = crawl_state.get('newest_utime')
+    if newest_utime is None:
+        return list(posts_window)
+    return [post_id for post_id, utime in posts_window.items() if utime > newest_utime]
+
+
+def get_posts_window(raw_posts: List[dict], post_ids: List[str]) -> Dict[str, int]:
+    """
+    Return {post id: utime} of crawled posts
+    """
+    return {
+        str(post_id): int(raw_post['utime'])
+        for raw_post, post_id in zip(raw_posts, post_ids)
+        if raw_post['utime']
+    }
+
+
+def save_crawl_state(
+        collection: 'Collection',
+        club_link: str,
+        posts_window: Dict[str, int],
+        is_full_crawl: bool
+) -> None:
+    """
+    Replace posts window of club by the last crawl. Window is not merged with the previous one,
+    so posts which changed their id or were removed do not stay in the state forever
+    """
+    now = datetime.datetime.now()
+    state = {
+        'posts': posts_window,
+        'last_crawl': now,
+    }
+    if posts_window:
+        state['newest_utime'] = max(posts_window.values())
+    if is_full_crawl:
+        state['last_full_crawl'] = now
+    collection.update_one({'club_link': club_link}, {'$set': state}, upsert=True)
@@ -1,7 +1,7 @@
-from typing import Tuple, List
+from typing import List, Optional, Tuple
 
 from selenium_parsers.utils.constants import AccessStatus
-from selenium_parsers.utils.database import update_records, get_postgres_connection
+from selenium_parsers.utils.database import update_records, get_postgres_connection, get_str_datetime
 
 
 def update_account_status(fb_login: str, status: AccessStatus) -> None:
@@ -40,9 +40,26 @@ def get_facebook_account() -> Tuple[str, str, str, List[dict]]:
     return account_record
 
 
-def get_facebook_proxy() -> Tuple[str, str]:
+def get_facebook_proxies() -> List[Tuple[str, str]]:
     """
-    Return ip and port of proxy, that was used less often
+    Return ip and port of all facebook proxies
+    """
+    connection = get_postgres_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT ip, port FROM api_facebookproxy')
+        proxy_records = cursor.fetchall()
+    finally:
+        connection.close()
+    return proxy_records
+
+
+def take_facebook_proxies(count: int) -> List[Tuple[str, str]]:
+    """
+    Return ip and port of proxies, that were used less often, and mark them used by one transaction,
+    proxies failed the last health check are returned only if there are no others.
+    Rows are locked only until commit, so parsers taking proxies at the same time get different ones,
+    later calls are spread by date_last_usage ordering, proxies are not reserved for the whole run
     """
     connection = get_postgres_connection()
     try:
@@ -52,10 +69,25 @@ def get_facebook_proxy() -> Tuple[str, str]:
                 ip,
                 port
             FROM api_facebookproxy
-            ORDER BY date_last_usage
-            LIMIT 1
-        ''')
-        account_record = cursor.fetchone()
+            ORDER BY (last_usage_status = %(fail)s) IS TRUE, date_last_usage
+            LIMIT %(count)s
+            FOR UPDATE SKIP LOCKED
+        ''', {'fail': f'{AccessStatus.fail}', 'count': count})
+        proxy_records = cursor.fetchall()
+        if proxy_records:
+            cursor.executemany(
+                'UPDATE api_facebookproxy SET date_last_usage=%(date)s WHERE ip=%(ip)s',
+                [{'date': get_str_datetime(), 'ip': f'{ip}'} for ip, _ in proxy_records]
+            )
+        connection.commit()
     finally:
         connection.close()
-    return account_record
+    return proxy_records
+
+
+def get_facebook_proxy() -> Optional[Tuple[str, str]]:
+    """
+    Return ip and port of proxy, that was used less often
+    """
+    proxy_records = take_facebook_proxies(1)
+    return proxy_records[0] if proxy_records else None
@@ -7,3 +7,9 @@ class FacebookParseError(Exception):
     """
     Global parser error, raise when executing is not possible
     """
+
+
+class FacebookPostParseError(FacebookParseError):
+    """
+    Post error, other posts of the page can be parsed
+    """
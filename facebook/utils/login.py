@@ -1,5 +1,4 @@
 import logging
-from time import sleep
 from typing import TYPE_CHECKING, Tuple
 
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
@@ -12,6 +11,7 @@ from selenium.webdriver.support.wait import WebDriverWait
 from selenium_parsers.facebook.utils.database import update_account_status
 from selenium_parsers.utils.constants import AccessStatus
 from selenium_parsers.utils.selenium_utils import write_text
+from selenium_parsers.utils.waits import open_page
 
 if TYPE_CHECKING:
     from selenium.webdriver.chrome.webdriver import WebDriver
@@ -44,10 +44,12 @@ def get_design_special_page(driver: 'WebDriver') -> Tuple['WebElement', 'WebElem
     """
     Special login page
     """
-    driver.get(
-        'https://www.facebook.com/login/device-based/regular/login/?login_attempt=1&lwv=110'
+    open_page(
+        driver,
+        'https://www.facebook.com/login/device-based/regular/login/?login_attempt=1&lwv=110',
+        'facebook_login',
+        logger
     )
-    sleep(2)
     login_field = driver.find_element_by_xpath('//input[@id="email"]')
     password_field = driver.find_element_by_xpath('//input[@id="pass"]')
     submit_btn = driver.find_element_by_xpath('//button[@id="loginbutton"]')
@@ -80,8 +82,7 @@ def login_blindly(
     Login without searching for items
     """
     logger.info('try blindly login')
-    driver.get('https://www.facebook.com/login')
-    sleep(2)
+    open_page(driver, 'https://www.facebook.com/login', 'facebook_login', logger)
     ActionChains(driver).send_keys(user_login).perform()
     ActionChains(driver).send_keys(Keys.TAB).perform()
     ActionChains(driver).send_keys(user_passwd).perform()
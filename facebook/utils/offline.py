@@ -0,0 +1,135 @@
+"""
+Offline versions of page and post extraction, they parse archived html by lxml
+and return the same raw data as browser extractors
+"""
+from typing import List, Optional
+
+from lxml import html as lxml_html
+
+from selenium_parsers.facebook.utils.general import FacebookParseError
+from selenium_parsers.facebook.utils.post import LIKES_LABEL, COMMENTS_WORD, SHARES_WORD
+
+# elements which start a new line of browser visible text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul',
+}
+SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+
+def parse_html(page_source: str) -> lxml_html.HtmlElement:
+    return lxml_html.fromstring(page_source)
+
+
+def get_inner_text(element: lxml_html.HtmlElement) -> str:
+    """
+    Approximate browser innerText: block elements are separated by line breaks
+    """
+    parts = []
+
+    def walk(node: lxml_html.HtmlElement) -> None:
+        tag = node.tag if isinstance(node.tag, str) else ''
+        if tag in SKIP_TAGS:
+            return
+        is_block = tag in BLOCK_TAGS
+        if is_block:
+            parts.append('\n')
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if is_block:
+            parts.append('\n')
+
+    walk(element)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def get_class_selector(element: lxml_html.HtmlElement) -> str:
+    return '.' + '.'.join(element.get('class', '').split(' '))
+
+
+def get_post_parent_selector(tree: lxml_html.HtmlElement) -> str:
+    """
+    Find posts parent container on community posts page
+    """
+    likes_blocks = tree.xpath('//*[contains(text(), "Нравится")]')
+    comments_blocks = tree.xpath('//*[contains(text(), "Комментировать")]')
+    shares_blocks = tree.xpath('//*[contains(text(), "Поделиться")]')
+
+    if len(likes_blocks) <= 0 or len(comments_blocks) <= 0 or len(shares_blocks) <= 0:
+        raise FacebookParseError(
+            f'can not parse reactions parent node, '
+            f'some block was not found: '
+            f'{len(likes_blocks)}, '
+            f'{len(comments_blocks)}, '
+            f'{len(shares_blocks)}'
+        )
+
+    ancestor = comments_blocks[len(comments_blocks) // 2]
+    while ancestor.getparent() is not None:
+        previous_parent = ancestor
+        ancestor = ancestor.getparent()
+
+        likes_cnt = len(ancestor.xpath('.//*[contains(text(), "Нравится")]'))
+        comments_cnt = len(ancestor.xpath('.//*[contains(text(), "Комментировать")]'))
+        shares_cnt = len(ancestor.xpath('.//*[contains(text(), "Поделиться")]'))
+
+        if likes_cnt > 1 and comments_cnt > 1 and shares_cnt > 1:
+            return get_class_selector(previous_parent)
+    raise FacebookParseError('cant not find main post ancestor')
+
+
+def extract_post_data(post: lxml_html.HtmlElement) -> dict:
+    """
+    Return raw post data like browser posts extractor does
+    """
+    likes_icons = post.xpath(f'.//*[@aria-label="{LIKES_LABEL}"]')
+    date_elements = post.xpath('.//a/abbr[@data-utime]')
+    images = post.xpath('.//div[@class="uiScaledImageContainer"]/img')
+    return {
+        'text': get_inner_text(post),
+        'likes': [get_inner_text(span) for span in likes_icons[0].getparent().iter('span')] if likes_icons else [],
+        'actions': {
+            word: [get_inner_text(element) for element in post.xpath(f'.//*[contains(text(), "{word}:")]')]
+            for word in (COMMENTS_WORD, SHARES_WORD)
+        },
+        'image': images[0].get('src') if images else None,
+        'utime': date_elements[0].get('data-utime') if date_elements else None,
+        'date_title': date_elements[0].get('title') if date_elements else None,
+        'permalink': date_elements[0].getparent().get('href') if date_elements else None,
+    }
+
+
+def extract_posts_data(tree: lxml_html.HtmlElement, posts_selector: str) -> List[dict]:
+    """
+    Return raw data of posts, which have exactly selector classes
+    """
+    class_name = posts_selector.lstrip('.').split('.')[0]
+    candidates = tree.xpath(f'//*[contains(concat(" ", @class, " "), " {class_name} ")]')
+    return [
+        extract_post_data(element) for element in candidates
+        if get_class_selector(element) == posts_selector
+    ]
+
+
+def get_display_name(tree: lxml_html.HtmlElement) -> Optional[str]:
+    for selector in ('//h1[@id="seo_h1_tag"]/a/span', '//h1[@id="seo_h1_tag"]'):
+        elements = tree.xpath(selector)
+        if elements:
+            return ''.join([c for c in get_inner_text(elements[0]) if c.isalnum() or c == ' '])
+    return None
+
+
+def get_club_id(tree: lxml_html.HtmlElement) -> Optional[str]:
+    elements = tree.xpath('//div/a[@href="#"][contains(text(), "@")]')
+    return get_inner_text(elements[0]) if elements else None
+
+
+def get_club_icon(tree: lxml_html.HtmlElement) -> str:
+    images = tree.xpath('//div[@id="entity_sidebar"]//img')
+    return images[0].get('src', '') if images else ''
@@ -1,15 +1,17 @@
+import datetime
 import logging
-from time import sleep
-from typing import TYPE_CHECKING, List, Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
-from selenium.webdriver.common.keys import Keys
 
 from selenium_parsers.facebook.utils.general import FacebookParseError
+from selenium_parsers.utils.counters import CounterParseError, find_counter, parse_counter
+from selenium_parsers.utils.scrolling import ScrollStats, scroll_until_loaded
+from selenium_parsers.utils.waits import open_page, wait_until_ready, xpath_present
 
 if TYPE_CHECKING:
+    from pymongo.collection import Collection
     from selenium.webdriver.chrome.webdriver import WebDriver
-    from selenium.webdriver.remote.webelement import WebElement  # noqa: F401
 
 logger = logging.getLogger('facebook_parser')
 
@@ -38,14 +40,11 @@ def get_page_info_from_members_and_likes_page_widget(
     sidebar_el = driver.find_element_by_xpath('//div[@id="pages_side_column"]')
     likes_child_el = sidebar_el.find_element_by_xpath('.//div[contains(text(), "Нравится ")]')
     members_child_el = sidebar_el.find_element_by_xpath('.//div[contains(text(), "Подписан")]')
-    likes_text = likes_child_el.text
-    members_text = members_child_el.text
-    likes_str = ''.join([c for c in likes_text if c.isdigit()])
-    members_str = ''.join([c for c in members_text if c.isdigit()])
+    likes_cnt = find_counter(likes_child_el.text)
+    members_cnt = find_counter(members_child_el.text)
 
-    driver.get(redirect_location)
-    sleep(2)
-    return int(likes_str), int(members_str)
+    open_page(driver, redirect_location, 'facebook', logger)
+    return likes_cnt, members_cnt
 
 
 def get_page_info_by_members_page_visit(
@@ -56,19 +55,24 @@ def get_page_info_by_members_page_visit(
     Use community page for extract page likes and members
     """
     driver.find_element_by_xpath('//div/a[@data-endpoint]/span[contains(text(), "Сообщество")]').click()
-    sleep(3)
+    wait_until_ready(
+        driver,
+        [xpath_present('//div[contains(text(), "Всего подписчиков")]')],
+        logger,
+        'facebook community page'
+    )
     members_child_el = driver.find_element_by_xpath('//div[contains(text(), "Всего подписчиков")]')
     likes_child_el = driver.find_element_by_xpath('//div[contains(text(), "Всего отметок")]')
     likes_cnt = 0
     members_cnt = 0
     for slug, block in (('members', members_child_el), ('likes', likes_child_el)):
         block = block.find_element_by_xpath('..')
-        cnt = int(block.find_elements_by_xpath('.//div')[0].text.replace(' ', ''))
+        cnt = parse_counter(block.find_elements_by_xpath('.//div')[0].text)
         if slug == 'members':
             members_cnt = cnt
         elif slug == 'likes':
             likes_cnt = cnt
-    driver.get(redirect_location)
+    open_page(driver, redirect_location, 'facebook', logger)
     return likes_cnt, members_cnt
 
 
@@ -83,7 +87,7 @@ def get_members_and_page_like_count(driver: 'WebDriver', redirect_location: str)
     for i, method in enumerate(methods, start=1):
         try:
             likes, members = method(driver, redirect_location)
-        except NoSuchElementException:
+        except (NoSuchElementException, CounterParseError):
             logger.warning(f'can not parse members and likes page info try {i}')
         else:
             return likes, members
@@ -91,118 +95,120 @@ def get_members_and_page_like_count(driver: 'WebDriver', redirect_location: str)
     raise FacebookParseError
 
 
-def get_single_post_selector(driver: 'WebDriver') -> str:
+# one script walks up from a reactions block until the ancestor contains the required counts of blocks,
+# class of the previous ancestor is posts container selector
+FIND_POSTS_CONTAINER_SCRIPT = """
+const [startText, startIndex, countTexts, condition] = arguments;
+const findByText = (text) => {
+    const result = document.evaluate(
+        `//*[contains(text(), "${text}")]`, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const nodes = [];
+    for (let i = 0; i < result.snapshotLength; i++) {
+        nodes.push(result.snapshotItem(i));
+    }
+    return nodes;
+};
+const startBlocks = findByText(startText);
+const countBlocks = countTexts.map(findByText);
+const counts = countBlocks.map(blocks => blocks.length);
+if (startBlocks.length === 0 || counts.some(count => count === 0)) {
+    return {selector: null, counts: [startBlocks.length].concat(counts)};
+}
+let ancestor = startBlocks[startIndex === 'middle' ? Math.floor(startBlocks.length / 2) : 0];
+for (let i = 0; i < 100 && ancestor.parentElement; i++) {
+    const previousParent = ancestor;
+    ancestor = ancestor.parentElement;
+    const inside = countBlocks.map(blocks => blocks.filter(block => ancestor.contains(block)).length);
+    const found = condition === 'many' ? inside.every(count => count > 1) : inside.every(count => count === 1);
+    if (found) {
+        return {selector: '.' + (previousParent.getAttribute('class') || '').split(' ').join('.'), counts: counts};
+    }
+}
+return {selector: null, counts: counts};
+"""
+
+# selector is valid when there are posts with exactly its classes and they have reactions blocks
+VALIDATE_POSTS_SELECTOR_SCRIPT = """
+const [selector, text] = arguments;
+return Array.from(document.querySelectorAll(selector)).filter(
+    el => '.' + el.getAttribute('class').split(' ').join('.') === selector && el.innerText.includes(text)
+).length;
+"""
+
+
+def find_posts_container(
+        driver: 'WebDriver',
+        start_text: str,
+        start_index: str,
+        count_texts: Tuple[str, ...],
+        condition: str
+) -> str:
     """
-    Find posts parent container on single post page
+    Walk up from the first or the middle block with start text until every count text is found
+    more than once ('many') or exactly once ('single') in the ancestor
     """
-    comments_blocks = driver.find_elements_by_xpath('//*[contains(text(), "Комментарии")]')
-    shares_blocks = driver.find_elements_by_xpath('//*[contains(text(), "Поделились")]')
-
-    if len(comments_blocks) <= 0 or len(shares_blocks) <= 0:
+    result = driver.execute_script(FIND_POSTS_CONTAINER_SCRIPT, start_text, start_index, list(count_texts), condition)
+    if result['selector'] is None:
         raise FacebookParseError(
-            f'can not parse reactions parent node, '
-            f'some block was not found: '
-            f'{len(comments_blocks)}, '
-            f'{len(shares_blocks)}'
+            f'can not find main post ancestor, reactions blocks counts: {", ".join(map(str, result["counts"]))}'
         )
+    return result['selector']
 
-    ancestor_container = comments_blocks[0]
-
-    i = 0
-    max_iteration_cnt = 100
-    while i < max_iteration_cnt:
-        i += 1
-        previous_parent = ancestor_container
-        ancestor = ancestor_container.find_element_by_xpath('..')
-
-        comments_cnt = len(ancestor.find_elements_by_xpath('.//*[contains(text(), "Комментировать")]'))
-        shares_cnt = len(ancestor.find_elements_by_xpath('.//*[contains(text(), "Поделиться")]'))
 
-        if comments_cnt == 1 and shares_cnt == 1:
-            post_parent_class = previous_parent.get_attribute('class')
-            return '.' + '.'.join(post_parent_class.split(' '))
-    raise FacebookParseError('cant not find main post ancestor')
+def get_single_post_selector(driver: 'WebDriver') -> str:
+    """
+    Find posts parent container on single post page
+    """
+    return find_posts_container(driver, 'Комментарии', 'first', ('Комментировать', 'Поделиться'), 'single')
 
 
 def get_post_parent_selector(driver: 'WebDriver') -> str:
     """
     Find posts parent container on community posts page
     """
-    likes_blocks = driver.find_elements_by_xpath('//*[contains(text(), "Нравится")]')
-    comments_blocks = driver.find_elements_by_xpath('//*[contains(text(), "Комментировать")]')
-    shares_blocks = driver.find_elements_by_xpath('//*[contains(text(), "Поделиться")]')
-
-    if len(likes_blocks) <= 0 or len(comments_blocks) <= 0 or len(shares_blocks) <= 0:
-        raise FacebookParseError(
-            f'can not parse reactions parent node, '
-            f'some block was not found: '
-            f'{len(likes_blocks)}, '
-            f'{len(comments_blocks)}, '
-            f'{len(shares_blocks)}'
-        )
+    return find_posts_container(
+        driver, 'Комментировать', 'middle', ('Нравится', 'Комментировать', 'Поделиться'), 'many'
+    )
 
-    ancestor = comments_blocks[len(comments_blocks) // 2]
 
-    i = 0
-    max_iteration_cnt = 100
-    while i < max_iteration_cnt:
-        i += 1
-        previous_parent = ancestor
-        ancestor = ancestor.find_element_by_xpath('..')
+def is_posts_selector_valid(driver: 'WebDriver', posts_selector: str) -> bool:
+    return driver.execute_script(VALIDATE_POSTS_SELECTOR_SCRIPT, posts_selector, 'Комментировать') > 0
 
-        likes_cnt = len(ancestor.find_elements_by_xpath('.//*[contains(text(), "Нравится")]'))
-        comments_cnt = len(ancestor.find_elements_by_xpath('.//*[contains(text(), "Комментировать")]'))
-        shares_cnt = len(ancestor.find_elements_by_xpath('.//*[contains(text(), "Поделиться")]'))
 
-        if likes_cnt > 1 and comments_cnt > 1 and shares_cnt > 1:
-            post_parent_class = previous_parent.get_attribute('class')
-            return '.' + '.'.join(post_parent_class.split(' '))
-    raise FacebookParseError('cant not find main post ancestor')
+def get_cached_post_parent_selector(driver: 'WebDriver', collection: 'Collection', club_link: str) -> str:
+    """
+    Return posts selector of club page found by the previous run if it is still valid, else find it again
+    """
+    cached = collection.find_one({'club_link': club_link})
+    if cached and is_posts_selector_valid(driver, cached['posts_selector']):
+        return cached['posts_selector']
+
+    posts_selector = get_post_parent_selector(driver)
+    logger.info(f'posts selector of {club_link} is found: {posts_selector}')
+    collection.update_one(
+        {'club_link': club_link},
+        {'$set': {'posts_selector': posts_selector, 'datetime': datetime.datetime.now()}},
+        upsert=True
+    )
+    return posts_selector
 
 
 def scroll_while_loading(
         driver: 'WebDriver',
         posts_css_selector: str,
         trigger: Optional[callable] = None,
-        trigger_kwargs: Optional[dict] = None
-) -> None:
-    """
-    Scroll page while posts are loading or max iteration was reached
-    """
-    prev_posts_count = len(driver.find_elements_by_css_selector(posts_css_selector))
-
-    current_posts_count = 0
-    max_iteration_count = 100
-    i = 0
-    while (
-        prev_posts_count != current_posts_count
-        and current_posts_count < 1200
-        and i < max_iteration_count
-    ):
-        i += 1
-        html = driver.find_element_by_tag_name('html')
-        for _ in range(4):
-            html.send_keys(Keys.END)
-            sleep(0.3)
-        sleep(2)
-        prev_posts_count = current_posts_count
-        current_posts_count = len(driver.find_elements_by_css_selector(posts_css_selector))
-        if trigger:
-            trigger(**trigger_kwargs)
-
-
-def extract_posts(driver: 'WebDriver', posts_selector: str) -> List['WebElement']:
+        trigger_kwargs: Optional[dict] = None,
+        min_utime: Optional[int] = None
+) -> ScrollStats:
     """
-    Return only posts items, filter other instances
+    Scroll page while posts are loading or max posts count was reached,
+    trigger is called when posts stop loading, scrolling goes on if it returns true.
+    Scrolling stops at posts published before min utime
     """
-    elements = driver.find_elements_by_css_selector(posts_selector)
-    posts = []
-    for element in elements:
-        el_classes = element.get_attribute('class')
-        el_selector = '.' + '.'.join(el_classes.split(' '))
-        if el_selector == posts_selector:
-            posts.append(element)
-    return posts
+    on_quiet = (lambda: bool(trigger(**(trigger_kwargs or {})))) if trigger else None
+    stop_below = ('a > abbr[data-utime]', 'data-utime', min_utime) if min_utime else None
+    return scroll_until_loaded(driver, posts_css_selector, logger, on_quiet=on_quiet, stop_below=stop_below)
 
 
 def get_display_name(driver: 'WebDriver') -> Optional[str]:
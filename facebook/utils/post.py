@@ -1,21 +1,81 @@
-from typing import Optional, TYPE_CHECKING
+import hashlib
+import re
+from typing import Dict, List, Optional, TYPE_CHECKING, Union
 
-import dateparser
-from selenium.common.exceptions import NoSuchElementException
-
-from selenium_parsers.facebook.utils.general import FacebookParseError
+from selenium_parsers.facebook.utils.general import FacebookPostParseError
+from selenium_parsers.utils.counters import CounterParseError, parse_counter, parse_counters
+from selenium_parsers.utils.dates import parse_date
 
 if TYPE_CHECKING:
     import datetime
+    from selenium.webdriver.chrome.webdriver import WebDriver
     from selenium.webdriver.remote.webelement import WebElement
 
+LIKES_LABEL = 'Посмотрите, кто отреагировал на это'
+COMMENTS_WORD = 'Комментарии'
+SHARES_WORD = 'Поделились'
+
+# collect raw data of all posts by one command instead of several commands per post,
+# posts are elements or css selector of posts, which have exactly selector classes;
+# posts published before min utime are skipped
+EXTRACT_POSTS_SCRIPT = """
+const [target, likesLabel, actionWords, minUtime] = arguments;
+const xpathAll = (xpath, node) => {
+    const result = document.evaluate(xpath, node, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const nodes = [];
+    for (let i = 0; i < result.snapshotLength; i++) {
+        nodes.push(result.snapshotItem(i));
+    }
+    return nodes;
+};
+const posts = typeof target === 'string'
+    ? Array.from(document.querySelectorAll(target)).filter(
+        el => '.' + el.getAttribute('class').split(' ').join('.') === target
+    )
+    : target;
+const postsData = [];
+for (const post of posts) {
+    const dateEl = xpathAll('.//a/abbr[@data-utime]', post)[0];
+    if (minUtime && dateEl && Number(dateEl.getAttribute('data-utime')) < minUtime) {
+        continue;
+    }
+    const likesIcons = post.querySelector(`[aria-label="${likesLabel}"]`);
+    const image = xpathAll('.//div[@class="uiScaledImageContainer"]/img', post)[0];
+    const actions = {};
+    for (const word of actionWords) {
+        actions[word] = xpathAll(`.//*[contains(text(), "${word}:")]`, post).map(el => el.innerText);
+    }
+    postsData.push({
+        text: post.innerText,
+        likes: likesIcons ? Array.from(likesIcons.parentElement.querySelectorAll('span'), span => span.innerText) : [],
+        actions: actions,
+        image: image ? image.src : null,
+        utime: dateEl ? dateEl.getAttribute('data-utime') : null,
+        date_title: dateEl ? dateEl.getAttribute('title') : null,
+        permalink: dateEl ? dateEl.parentElement.getAttribute('href') : null,
+    });
+}
+return postsData;
+"""
+
+
+def extract_posts_data(
+        driver: 'WebDriver',
+        posts: Union[str, List['WebElement']],
+        min_utime: Optional[int] = None
+) -> List[dict]:
+    """
+    Return raw data of posts: text, likes spans texts, actions texts, image link, utime, date title
+    and permalink
+    """
+    return driver.execute_script(EXTRACT_POSTS_SCRIPT, posts, LIKES_LABEL, [COMMENTS_WORD, SHARES_WORD], min_utime)
 
-def get_post_short_text(post_el: 'WebElement') -> str:
+
+def get_short_text(post_text: str) -> str:
     """
-    Get post visible text
+    Get post message from post visible text
     """
-    post_el_text = post_el.text
-    post_el_text_lines = post_el_text.split('\n')
+    post_el_text_lines = post_text.split('\n')
     post_message_text = post_el_text_lines[2:]
     stop_words = ('Комментарии:', 'Поделились:', 'Нравится', 'Комментировать', 'Поделиться')
     lines = []
@@ -32,93 +92,93 @@ def get_post_short_text(post_el: 'WebElement') -> str:
     return short_text
 
 
-def generate_post_id(post_short_text: str) -> int:
+# version is saved with post id, it is a part of posts unique key, so ids of different schemes never clash:
+# 2 - sha1 of utime and text, 3 - sha1 of utime and story fbid of permalink
+POST_ID_VERSION = 3
+
+STORY_FBID_RE = re.compile(r'[?&]story_fbid=(\d+)')
+PATH_FBID_RE = re.compile(r'/(\d{5,})(?=/|$)')
+
+
+def get_story_fbid(permalink: Optional[str]) -> Optional[str]:
+    """
+    Get story id from post permalink: '/permalink.php?story_fbid=123&id=456', '/club/posts/123/',
+    '/club/photos/a.1/123/?type=3', '/club/videos/123/'
+    """
+    if not permalink:
+        return None
+    match = STORY_FBID_RE.search(permalink)
+    if match:
+        return match.group(1)
+    fbids = PATH_FBID_RE.findall(permalink.split('?')[0])
+    return fbids[-1] if fbids else None
+
+
+def generate_post_id(post_short_text: str, utime: Optional[str], permalink: Optional[str] = None) -> str:
     """
-    Generation post unique id
+    Generate post id which is the same in every run and in browser and offline parsing:
+    sha1 of publication time and story fbid of permalink, both are attributes of the date link.
+    Post without fbid in permalink falls back to its text, which is rendered differently offline
     """
-    return abs(hash(f'{post_short_text}')) % (10 ** 8)
+    story_fbid = get_story_fbid(permalink)
+    if story_fbid:
+        source = f'{utime or ""}:{story_fbid}'
+    else:
+        source = f'{utime or ""}:text:{" ".join(post_short_text.split()).casefold()}'
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
 
 
-def get_post_date(post: 'WebElement') -> 'datetime.datetime':
+def parse_post_date(post_date_str: Optional[str], utime: Optional[str] = None) -> 'datetime.datetime':
     """
-    Parse post date create
+    Parse post date create from date title or data-utime
     """
-    post_date_str = post.find_element_by_xpath('.//a/abbr[@data-utime]').get_attribute('title')
-    import locale
-    locale.setlocale(locale.LC_TIME, 'ru_RU.UTF-8')
-    date = dateparser.parse(post_date_str, date_formats=['%A, %d %B %Y г. в %H:%M'], languages=['ru'])
+    if post_date_str is None and utime is None:
+        raise FacebookPostParseError('post date was not found')
+    date = parse_date(post_date_str, utime)
+    if date is None:
+        raise FacebookPostParseError(f'can not parse post date {post_date_str}')
     return date
 
 
-def get_post_img(post: 'WebElement') -> Optional[str]:
+def get_actions_count(actions_texts: List[str], post_name: str, sub_string: str) -> int:
     """
-    Parse post image link
+    Parse post actions count such as comments and shares from texts of elements contains substring
     """
-    for idx in (0, 1):
+    if len(actions_texts) > 1:
+        raise FacebookPostParseError(f'can not parse post {post_name}, too mach blocks - {sub_string}')
+    if len(actions_texts) == 1:
+        count_part = actions_texts[0].replace(sub_string, '')
         try:
-            fb_link = (
-                post
-                .find_elements_by_xpath(
-                    './/div[@class="uiScaledImageContainer"]/img'
-                )[idx].get_attribute('src')
-            )
-        except (IndexError, NoSuchElementException):
-            pass
-        else:
-            return fb_link
-    return None
-
-
-def parse_count(text: str) -> int:
-    """
-    Parse count from html tags
-    """
-    text = text.replace(',', '.').replace(':', '').replace(' ', '')
-    i = 0
-    digit_part = ''
-    while i < len(text) and (text[i].isdigit() or text[i] == '.'):
-        digit_part += text[i]
-        i += 1
-    digit = float(digit_part)
-    k = 1
-    for suffix in ('тыс.', 'тысяч'):
-        if suffix in text:
-            k = 1000
-    for suffix in ('млн.', 'миллионов'):
-        if suffix in text:
-            k = 10**6
-    return int(digit * k)
-
-
-def get_actions_count(post_el: 'WebElement', post_name: str, sub_string: str) -> int:
-    """
-    Parse post actions count such as comments and shares from html elements contains substring
-    """
-    comments_block = post_el.find_elements_by_xpath(f'.//*[contains(text(), "{sub_string}:")]')
-    if len(comments_block) > 1:
-        raise FacebookParseError(f'can not parse post {post_name}, too mach blocks - {sub_string}')
-    if len(comments_block) == 1:
-        count_part = comments_block[0].text.replace(sub_string, '')
-        return parse_count(count_part)
+            return parse_counter(count_part)
+        except CounterParseError as e:
+            raise FacebookPostParseError(f'can not parse post {post_name}, {sub_string} count') from e
     return 0
 
 
-def get_likes_count(post_el: 'WebElement') -> int:
+def get_likes_count(likes_texts: List[str]) -> int:
     """
-    Get post likes count
+    Get post likes count from spans near reactions icons, the first span with counter is used
     """
-    try:
-        likes_icons_block = post_el.find_element_by_xpath('.//*[@aria-label="Посмотрите, кто отреагировал на это"]')
-    except NoSuchElementException:
-        return 0
-
-    likes_block = likes_icons_block.find_element_by_xpath('..')
-    spans = likes_block.find_elements_by_xpath('.//span')
-    for span in spans:
-        try:
-            likes_cnt = int(span.text)
-        except (TypeError, ValueError):
-            pass
-        else:
+    for likes_cnt in parse_counters(likes_texts):
+        if likes_cnt is not None:
             return likes_cnt
     return 0
+
+
+def build_post_data(raw_post: dict, club_id: str) -> dict:
+    """
+    Build post data from raw data of extractor
+    """
+    post_short_text = get_short_text(raw_post['text'])
+    actions: Dict[str, List[str]] = raw_post['actions']
+    return {
+        'club_id': club_id,
+        'post_id': generate_post_id(post_short_text, raw_post['utime'], raw_post['permalink']),
+        'post_id_version': POST_ID_VERSION,
+        'post_img': raw_post['image'],
+        'content': post_short_text,
+        'comments_count': get_actions_count(actions[COMMENTS_WORD], post_short_text, COMMENTS_WORD),
+        'shares_count': get_actions_count(actions[SHARES_WORD], post_short_text, SHARES_WORD),
+        'likes_count': get_likes_count(raw_post['likes']),
+        'datetime': parse_post_date(raw_post['date_title'], raw_post['utime']),
+    }
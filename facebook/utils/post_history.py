@@ -0,0 +1,93 @@
+"""
+History of facebook posts counters: sample is saved only when likes, comments or shares of post
+were changed since the previous crawl, counters of the previous crawl are taken from posts collection.
+Club totals are summed over posts collection too, so they do not depend on posts loaded by the crawl
+"""
+from typing import TYPE_CHECKING, Dict, List
+
+import pymongo
+
+from selenium_parsers.facebook.utils.post import POST_ID_VERSION
+
+if TYPE_CHECKING:
+    from pymongo.collection import Collection
+    from selenium_parsers.utils.mongo_models import FacebookPostData
+
+COUNTERS = ('likes_count', 'comments_count', 'shares_count')
+
+
+def ensure_history_index(history_collection: 'Collection') -> None:
+    history_collection.create_index([
+        ('club_id', pymongo.ASCENDING),
+        ('post_id', pymongo.ASCENDING),
+        ('datetime', pymongo.ASCENDING),
+    ])
+
+
+def get_changed_samples(
+        posts_collection: 'Collection',
+        club_id: str,
+        fb_posts: List['FacebookPostData']
+) -> List[dict]:
+    """
+    Return counters samples of new posts and posts with changed counters,
+    saved counters of all posts are read by one query
+    """
+    saved_counters = {
+        post['post_id']: tuple(post.get(counter) for counter in COUNTERS)
+        for post in posts_collection.find(
+            {
+                'club_id': club_id,
+                'post_id': {'$in': [fb_post.post_id for fb_post in fb_posts]},
+                'post_id_version': fb_posts[0].post_id_version,
+            },
+            {'_id': False, 'post_id': True, **{counter: True for counter in COUNTERS}}
+        )
+    }
+    samples = []
+    for fb_post in fb_posts:
+        counters = tuple(getattr(fb_post, counter) for counter in COUNTERS)
+        if saved_counters.get(fb_post.post_id) == counters:
+            continue
+        sample = {'club_id': club_id, 'post_id': fb_post.post_id, 'datetime': fb_post.parse_datetime}
+        sample.update(zip(COUNTERS, counters))
+        samples.append(sample)
+    return samples
+
+
+def save_counters_history(
+        posts_collection: 'Collection',
+        history_collection: 'Collection',
+        club_id: str,
+        fb_posts: List['FacebookPostData']
+) -> int:
+    """
+    Save samples of changed counters, it must be called before posts are saved. Return count of samples
+    """
+    if not fb_posts:
+        return 0
+    samples = get_changed_samples(posts_collection, club_id, fb_posts)
+    if samples:
+        history_collection.insert_many(samples, ordered=False)
+    return len(samples)
+
+
+def get_club_totals(posts_collection: 'Collection', club_id: str) -> Dict[str, int]:
+    """
+    Return count of posts and sums of their counters over all saved posts of club,
+    posts saved with ids of other versions are not counted, they duplicate current ones
+    """
+    totals = next(posts_collection.aggregate([
+        {'$match': {'club_id': club_id, 'post_id_version': POST_ID_VERSION}},
+        {'$group': {
+            '_id': None,
+            'posts_count': {'$sum': 1},
+            'posts_likes': {'$sum': '$likes_count'},
+            'comments_count': {'$sum': '$comments_count'},
+            'shares_count': {'$sum': '$shares_count'},
+        }},
+    ]), {})
+    return {
+        field: totals.get(field, 0)
+        for field in ('posts_count', 'posts_likes', 'comments_count', 'shares_count')
+    }
@@ -1,12 +1,17 @@
 import logging
-from time import sleep
+from typing import Dict, List
 
 import pymongo
 from selenium.common.exceptions import NoSuchElementException
 
 from selenium_parsers.odnoklassniki.ok_logger import setup_ok_logger
-from selenium_parsers.utils.constants import OK_SCREENSHOTS_DIR, OK_PROXY_IP, OK_PROXY_PORT
+from selenium_parsers.utils.constants import OK_SCREENSHOTS_DIR, OK_PROXY_IP, OK_PROXY_PORT, OK_PID_PATH, \
+    OK_PROXIES, OK_DEBUGGING_PORT, OK_SHARDS
+from selenium_parsers.utils.counters import CounterParseError, parse_counter
+from selenium_parsers.utils.parsers_signals import setup_signals_handlers, process_terminate
 from selenium_parsers.utils.parsing import BaseParser
+from selenium_parsers.utils.sharding import run_shards
+from selenium_parsers.utils.waits import open_page
 
 logger = logging.getLogger('odnoklassniki_parser')
 
@@ -16,9 +21,9 @@ class OdnoklassnikiParser(BaseParser):
     This parser are intended for enrich existing mongo documents
     by new data, which can not got by ok api
     """
-    def __init__(self):
-        logger.info('odnoklassniki parser initialization start')
-        super().__init__()
+    def __init__(self, shard_id: int = 0):
+        logger.info(f'odnoklassniki parser initialization start, shard {shard_id}')
+        super().__init__(shard_id)
 
     @property
     def parser_name(self):
@@ -32,10 +37,26 @@ class OdnoklassnikiParser(BaseParser):
     def _proxy_port(self):
         return OK_PROXY_PORT
 
+    @property
+    def _proxies(self):
+        return OK_PROXIES
+
+    @property
+    def _debugging_port(self):
+        return OK_DEBUGGING_PORT
+
     @property
     def _logger(self):
         return logger
 
+    @property
+    def _pid_path(self):
+        return OK_PID_PATH
+
+    @property
+    def _blocking_profile(self):
+        return 'odnoklassniki'
+
     @property
     def screenshot_dir(self):
         return OK_SCREENSHOTS_DIR
@@ -51,8 +72,8 @@ class OdnoklassnikiParser(BaseParser):
             text
         )
         try:
-            views_count = int(view_el_text.split('&nbsp;')[0].split(' ')[0])
-        except (TypeError, IndexError):
+            views_count = parse_counter(view_el_text)
+        except CounterParseError:
             logger.error(f'can not cast ok post views to int: {view_el_text}')
         else:
             obj['views_count'] = views_count
@@ -61,19 +82,19 @@ class OdnoklassnikiParser(BaseParser):
         """
         Add some parsed data to mongo document
         """
-        self._driver.get(obj['post_link'])
-        sleep(2)
+        open_page(self._driver, obj['post_link'], 'odnoklassniki', logger)
         self.add_views(obj)
         obj['is_need_selenium_parsing'] = False
 
 
-if __name__ == '__main__':
-    setup_ok_logger()
-    ok_parser = OdnoklassnikiParser()
+def run_shard(shard_id: int, ok_objects: List[dict]) -> Dict[str, int]:
+    """
+    Enrich ok posts of one shard by its own driver and mongo connection
+    """
+    stats = {'posts': len(ok_objects), 'parsed_posts': 0}
+    ok_parser = OdnoklassnikiParser(shard_id)
     with pymongo.MongoClient('mongodb://mongo', 27017) as mongo_client:
-        mongo_db = mongo_client['owl_project']
-        ok_posts_data = mongo_db['ok_wall_celery']
-        ok_objects = ok_posts_data.find({'is_need_selenium_parsing': True})
+        ok_posts_data = mongo_client['owl_project']['ok_wall_celery']
         try:
             for obj in ok_objects:
                 try:
@@ -86,5 +107,17 @@ if __name__ == '__main__':
                     )
                 else:
                     ok_posts_data.replace_one({'_id': obj['_id']}, obj)
+                    stats['parsed_posts'] += 1
+                ok_parser.page_done()
         finally:
             ok_parser.free()
+    return stats
+
+
+if __name__ == '__main__':
+    setup_ok_logger()
+    setup_signals_handlers(process_terminate)
+    with pymongo.MongoClient('mongodb://mongo', 27017) as mongo_client:
+        objects = list(mongo_client['owl_project']['ok_wall_celery'].find({'is_need_selenium_parsing': True}))
+    # pymongo client must not be shared with forked shards, documents are fetched before the fork
+    run_shards(run_shard, objects, OK_SHARDS, OK_PID_PATH, logger, key=lambda obj: str(obj['_id']))
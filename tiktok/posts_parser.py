@@ -1,7 +1,7 @@
 import datetime
 import logging
 from time import sleep
-from typing import Generator
+from typing import Dict, Generator, List
 
 import pymongo
 from selenium.common.exceptions import NoSuchElementException
@@ -9,10 +9,14 @@ from selenium.webdriver.common.keys import Keys
 
 from selenium_parsers.facebook.utils.page import scroll_while_loading
 from selenium_parsers.tiktok.tiktok_logger import setup_tiktok_logger
-from selenium_parsers.utils.constants import TIKTOK_PROXY_IP, TIKTOK_PROXY_PORT, TIKTOK_SCREENSHOTS_DIR, DEBUG
+from selenium_parsers.utils.constants import TIKTOK_PROXY_IP, TIKTOK_PROXY_PORT, TIKTOK_SCREENSHOTS_DIR, DEBUG, \
+    TIKTOK_PID_PATH, TIKTOK_PROXIES, TIKTOK_DEBUGGING_PORT, TIKTOK_SHARDS
+from selenium_parsers.utils.counters import CounterParseError, parse_counter
 from selenium_parsers.utils.database import get_selenium_links
 from selenium_parsers.utils.parsers_signals import setup_signals_handlers, process_terminate
 from selenium_parsers.utils.parsing import BaseParser
+from selenium_parsers.utils.sharding import run_shards
+from selenium_parsers.utils.waits import open_page, wait_until_ready, element_present, element_absent
 
 logger = logging.getLogger('tiktok_parser')
 
@@ -24,9 +28,9 @@ class TikTokParsingError(Exception):
 class TikTokParser(BaseParser):
     _post_item_css_selector = '.video-feed-item'
 
-    def __init__(self):
-        logger.info('tiktok parser initialization start')
-        super().__init__()
+    def __init__(self, shard_id: int = 0):
+        logger.info(f'tiktok parser initialization start, shard {shard_id}')
+        super().__init__(shard_id)
 
     @property
     def parser_name(self) -> str:
@@ -40,10 +44,26 @@ class TikTokParser(BaseParser):
     def _proxy_port(self) -> str:
         return TIKTOK_PROXY_PORT
 
+    @property
+    def _proxies(self) -> List[str]:
+        return TIKTOK_PROXIES
+
+    @property
+    def _debugging_port(self) -> int:
+        return TIKTOK_DEBUGGING_PORT
+
     @property
     def _logger(self):
         return logger
 
+    @property
+    def _pid_path(self) -> str:
+        return TIKTOK_PID_PATH
+
+    @property
+    def _blocking_profile(self) -> str:
+        return 'tiktok'
+
     @property
     def screenshot_dir(self) -> str:
         return TIKTOK_SCREENSHOTS_DIR
@@ -76,19 +96,22 @@ class TikTokParser(BaseParser):
         iterate through posts by clicking to post
         """
         if DEBUG:
-            self._driver.get('https://bot.sannysoft.com/')
-            sleep(2)
-        self._driver.get(link)
-        sleep(2)
+            open_page(self._driver, 'https://bot.sannysoft.com/', 'default', logger)
+        open_page(self._driver, link, 'tiktok', logger)
         self._scroll_to_bottom()
         self._scroll_to_top()
         posts = self._driver.find_elements_by_css_selector(self._post_item_css_selector)
         for post in posts:
             post.click()
-            sleep(2)
+            wait_until_ready(
+                self._driver,
+                [element_present('h1.video-meta-title'), element_present('strong.like-text')],
+                logger,
+                'tiktok post'
+            )
             yield
             self._driver.find_element_by_css_selector('img.control-icon.close').click()
-            sleep(1)
+            wait_until_ready(self._driver, [element_absent('img.control-icon.close')], logger, 'tiktok post close')
 
     def _get_post_content(self) -> str:
         """
@@ -160,20 +183,15 @@ class TikTokParser(BaseParser):
 
     def _get_counters(self, css_selector: str) -> int:
         """
-        Return number inside the container
+        Return number inside the container, tiktok shows label instead of zero counter
         """
         value_text = self._driver.find_element_by_css_selector(css_selector).text
-        value_base = float(''.join(c for c in value_text if c.isdigit() or c == '.'))
-        multiplier_slug = value_text[-1]
-        multipliers_map = {
-            'K': 1000,
-            'M': 10 ** 6
-        }
-        if multiplier_slug in multipliers_map:
-            multiplier = multipliers_map[multiplier_slug]
-        else:
-            multiplier = 1
-        return int(value_base * multiplier)
+        if not any(c.isdigit() for c in value_text):
+            return 0
+        try:
+            return parse_counter(value_text)
+        except CounterParseError as e:
+            raise TikTokParsingError(f'can not parse counter {css_selector}: {value_text}') from e
 
     def _get_likes_count(self) -> int:
         """
@@ -222,15 +240,12 @@ class TikTokParser(BaseParser):
                 tiktok_posts_data.insert_one(post_data)
 
 
-if __name__ == '__main__':
-    setup_tiktok_logger()
-    setup_signals_handlers(process_terminate)
-
-    tiktok_parser = TikTokParser()
-    pages = get_selenium_links(
-        column_name='tiktok_link',
-        table_name='api_tiktokchannels',
-    )
+def run_shard(shard_id: int, pages: List[str]) -> Dict[str, int]:
+    """
+    Parse tiktok channels of one shard by its own driver
+    """
+    stats = {'pages': len(pages), 'parsed_pages': 0}
+    tiktok_parser = TikTokParser(shard_id)
     try:
         for page in pages:
             try:
@@ -241,5 +256,20 @@ if __name__ == '__main__':
                     f'can not parse tiktok page: {page}, screenshot: {screenshot_file}',
                     exc_info=True
                 )
+            else:
+                stats['parsed_pages'] += 1
+            tiktok_parser.page_done()
     finally:
         tiktok_parser.free()
+    return stats
+
+
+if __name__ == '__main__':
+    setup_tiktok_logger()
+    setup_signals_handlers(process_terminate)
+
+    tiktok_pages = get_selenium_links(
+        column_name='tiktok_link',
+        table_name='api_tiktokchannels',
+    )
+    run_shards(run_shard, tiktok_pages, TIKTOK_SHARDS, TIKTOK_PID_PATH, logger)
@@ -0,0 +1,198 @@
+"""
+Resource blocking profiles: parsers read DOM only, so images, media, fonts and trackers
+are not downloaded through metered proxies. Blocked images keep their src attributes
+"""
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from weakref import WeakKeyDictionary
+
+from selenium_parsers.utils.cdp import add_network_observer
+from selenium_parsers.utils.constants import CHROME_BLOCK_RESOURCES
+
+if TYPE_CHECKING:
+    from logging import Logger
+    from selenium.webdriver.chrome.webdriver import WebDriver
+
+# Network.setBlockedURLs matches urls by wildcard patterns only, resource types are described by them
+RESOURCE_TYPE_PATTERNS = {
+    'image': ('*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.svg*', '*.ico*'),
+    'media': ('*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*', '*video.xx.fbcdn.net*', '*.tiktokcdn.com/*/video/*'),
+    'font': ('*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'),
+    'tracker': (
+        '*google-analytics.com*',
+        '*googletagmanager.com*',
+        '*doubleclick.net*',
+        '*mc.yandex.ru*',
+        '*top-fwz1.mail.ru*',
+        # pixel endpoint only, club pages like facebook.com/travel/ must not match
+        '*facebook.com/tr?*',
+        '*facebook.com/tr/*',
+    ),
+}
+
+# average size of blocked resources by devtools resource type, it is used until sizes of loaded
+# resources of the same type are seen
+ESTIMATED_SIZES = {
+    'Image': 30 * 1024,
+    'Media': 500 * 1024,
+    'Font': 40 * 1024,
+    'Script': 30 * 1024,
+}
+DEFAULT_ESTIMATED_SIZE = 5 * 1024
+
+
+def match_url_pattern(url: str, pattern: str) -> bool:
+    """
+    Match url like devtools blocking does: '*' is the only wildcard, '?' is a plain char
+    """
+    regexp = '.*'.join(re.escape(part) for part in pattern.split('*'))
+    return re.fullmatch(regexp, url) is not None
+
+
+class BlockingProfile:
+    """
+    Block requests by resource types and url patterns.
+    Devtools blocking has no exceptions, so block patterns matching any of allowed urls are dropped,
+    allowed urls are examples of pages and resources which parser needs
+    """
+    def __init__(
+            self,
+            resource_types: Iterable[str] = (),
+            url_patterns: Iterable[str] = (),
+            allowed_urls: Iterable[str] = ()
+    ):
+        self.resource_types = tuple(resource_types)
+        self.url_patterns = tuple(url_patterns)
+        self.allowed_urls = tuple(allowed_urls)
+
+    def all_patterns(self) -> List[str]:
+        patterns = []
+        for resource_type in self.resource_types:
+            patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+        patterns.extend(self.url_patterns)
+        return list(dict.fromkeys(patterns))
+
+    def is_allowed(self, pattern: str) -> bool:
+        return not any(match_url_pattern(url, pattern) for url in self.allowed_urls)
+
+    def blocked_urls(self) -> List[str]:
+        return [pattern for pattern in self.all_patterns() if self.is_allowed(pattern)]
+
+
+BLOCKING_PROFILES = {
+    # post images are parsed by src attribute, community page screenshots are taken for debugging only
+    'facebook': BlockingProfile(
+        resource_types=('image', 'media', 'font', 'tracker'),
+        allowed_urls=(
+            'https://ru-ru.facebook.com/tripadvisor/posts/',
+            'https://www.facebook.com/travel/posts/?ref=page_internal',
+            'https://www.facebook.com/pg/club/community/',
+            'https://static.xx.fbcdn.net/rsrc.php/v3/yT/l/0,cross/styles.css',
+            'https://static.xx.fbcdn.net/rsrc.php/v3/yK/r/scripts.js',
+        ),
+    ),
+    'odnoklassniki': BlockingProfile(
+        resource_types=('image', 'media', 'font', 'tracker'),
+        allowed_urls=(
+            'https://ok.ru/video/1234567890',
+            'https://ok.ru/group/1234567890/topic/1234567890',
+            'https://st.mycdn.me/static/app/css/main.css',
+        ),
+    ),
+    # post picture is taken from style of video card, not from loaded image
+    'tiktok': BlockingProfile(
+        resource_types=('image', 'media', 'font', 'tracker'),
+        allowed_urls=(
+            'https://www.tiktok.com/@channel',
+            'https://www.tiktok.com/@channel/video/1234567890',
+        ),
+    ),
+    'worker': BlockingProfile(
+        resource_types=('image', 'media', 'font', 'tracker'),
+        allowed_urls=(
+            'https://ru-ru.facebook.com/tripadvisor/posts/1234567890',
+            'https://www.tiktok.com/@channel/video/1234567890',
+            'https://ok.ru/video/1234567890',
+        ),
+    ),
+}
+
+
+class TrafficMeter:
+    """
+    Count transferred bytes and blocked requests by devtools network events.
+    Blocked requests are never sent, saved bytes are estimated by average size of loaded resources
+    of the same type, or by ESTIMATED_SIZES when such resources were not loaded
+    """
+    def __init__(self):
+        self.requests = 0
+        self.transferred_bytes = 0
+        self.blocked: Dict[str, int] = Counter()
+        # resource type by request id, loadingFinished event has no type
+        self._request_types: Dict[str, str] = {}
+        self._loaded: Dict[str, int] = Counter()
+        self._loaded_bytes: Dict[str, int] = Counter()
+
+    def __call__(self, method: str, params: dict) -> None:
+        if method == 'Network.requestWillBeSent':
+            self.requests += 1
+            self._request_types[params.get('requestId')] = params.get('type', 'Other')
+        elif method == 'Network.loadingFinished':
+            size = int(params.get('encodedDataLength', 0))
+            resource_type = self._request_types.pop(params.get('requestId'), 'Other')
+            self.transferred_bytes += size
+            self._loaded[resource_type] += 1
+            self._loaded_bytes[resource_type] += size
+        elif method == 'Network.loadingFailed':
+            self._request_types.pop(params.get('requestId'), None)
+            if params.get('blockedReason'):
+                self.blocked[params.get('type', 'Other')] += 1
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.transferred_bytes = 0
+        self.blocked.clear()
+        self._request_types.clear()
+
+    def get_average_size(self, resource_type: str) -> int:
+        if self._loaded[resource_type]:
+            return self._loaded_bytes[resource_type] // self._loaded[resource_type]
+        return ESTIMATED_SIZES.get(resource_type, DEFAULT_ESTIMATED_SIZE)
+
+    def get_saved_bytes(self) -> int:
+        return sum(count * self.get_average_size(resource_type) for resource_type, count in self.blocked.items())
+
+    def get_report(self) -> str:
+        blocked = ', '.join(f'{resource_type}: {count}' for resource_type, count in self.blocked.most_common())
+        return (
+            f'{self.requests} requests, {self.transferred_bytes / 1024:.0f}KB transferred, '
+            f'{sum(self.blocked.values())} blocked ({blocked or "none"}), '
+            f'~{self.get_saved_bytes() / 1024:.0f}KB saved'
+        )
+
+
+_traffic_meters: 'WeakKeyDictionary[WebDriver, TrafficMeter]' = WeakKeyDictionary()
+
+
+def get_traffic_meter(driver: 'WebDriver') -> Optional[TrafficMeter]:
+    return _traffic_meters.get(driver)
+
+
+def setup_blocking(driver: 'WebDriver', profile_name: str, logger: 'Logger') -> None:
+    """
+    Block requests of the profile in the driver and start traffic counting,
+    when blocking is disabled traffic is counted only, to compare pages with and without blocking
+    """
+    profile = BLOCKING_PROFILES[profile_name]
+    blocked_urls = profile.blocked_urls() if CHROME_BLOCK_RESOURCES else []
+    dropped = [pattern for pattern in profile.all_patterns() if not profile.is_allowed(pattern)]
+    if CHROME_BLOCK_RESOURCES and dropped:
+        logger.warning(f'{profile_name} blocking profile: patterns {dropped} match allowed urls and are not blocked')
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+
+    meter = TrafficMeter()
+    _traffic_meters[driver] = meter
+    add_network_observer(driver, meter)
+    logger.info(f'{profile_name} blocking profile: {len(blocked_urls)} url patterns are blocked')
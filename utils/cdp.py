@@ -0,0 +1,53 @@
+"""
+Helpers for chrome devtools protocol data, which is available through chromedriver
+"""
+import json
+from typing import TYPE_CHECKING, Callable, List, Tuple
+from weakref import WeakKeyDictionary
+
+from selenium.common.exceptions import WebDriverException
+
+if TYPE_CHECKING:
+    from selenium.webdriver.chrome.webdriver import WebDriver
+
+# chromedriver writes devtools network events to the performance log
+PERFORMANCE_LOGGING_PREFS = {
+    'enableNetwork': True,
+    'enablePage': False,
+}
+
+NetworkObserver = Callable[[str, dict], None]
+
+# performance log is drained on read, observers see every event regardless of the reader
+_network_observers: 'WeakKeyDictionary[WebDriver, List[NetworkObserver]]' = WeakKeyDictionary()
+
+
+def add_network_observer(driver: 'WebDriver', observer: NetworkObserver) -> None:
+    """
+    Call observer with (method, params) of every network event read from the driver
+    """
+    _network_observers.setdefault(driver, []).append(observer)
+
+
+def get_network_events(driver: 'WebDriver') -> List[Tuple[str, dict]]:
+    """
+    Drain chrome performance log and return devtools network events as (method, params) pairs
+    """
+    try:
+        entries = driver.get_log('performance')
+    except WebDriverException:
+        return []
+
+    events = []
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (ValueError, KeyError):
+            continue
+        if message.get('method', '').startswith('Network.'):
+            events.append((message['method'], message.get('params', {})))
+
+    for observer in _network_observers.get(driver, ()):
+        for method, params in events:
+            observer(method, params)
+    return events
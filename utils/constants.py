@@ -5,32 +5,143 @@ import environ
 env = environ.Env(
     DJANGO_DEBUG=(bool, False),
     USE_PROXY=(bool, False),
-    HEADLESS_SELENIUM_PARSERS=(bool, True)
+    HEADLESS_SELENIUM_PARSERS=(bool, True),
+    PAGE_WAIT_TIMEOUT=(float, 15.0),
+    CHROME_BLOCK_RESOURCES=(bool, True),
+    CHROME_LEAN_MODE=(bool, False),
+    CHROME_JS_HEAP_MB=(int, 512),
+    CHROME_RENDERER_PROCESS_LIMIT=(int, 2),
+    CHROME_PROFILES_DIR=(str, ''),
+    WEBDRIVER_STATUS_TIMEOUT=(float, 5.0),
+    WEBDRIVER_STANDALONE_CAPACITY=(int, 4),
+    SNAPSHOTS_DIR=(str, ''),
+    FACEBOOK_REFRESH_WINDOW_HOURS=(int, 72),
+    FACEBOOK_SHARDS=(int, 1),
+    FACEBOOK_DEBUGGING_PORT=(int, 9300),
+    OK_SHARDS=(int, 1),
+    OK_DEBUGGING_PORT=(int, 9400),
+    TIKTOK_SHARDS=(int, 1),
+    TIKTOK_DEBUGGING_PORT=(int, 9500),
+    SNAPSHOTS_MAX_AGE_DAYS=(int, 30),
+    SNAPSHOTS_MAX_MB=(int, 2048),
+    CHROME_PROFILE_MAX_MB=(int, 500),
+    CHROME_DISK_CACHE_MB=(int, 100),
+    CHROME_RECYCLE_PAGES=(int, 300),
+    CHROME_RECYCLE_AGE=(int, 4 * 60 * 60),
+    CHROME_RECYCLE_RSS_MB=(int, 1500),
+    SELENIUM_WORKER_CONSUMERS=(int, 1),
+    SELENIUM_WORKER_DEBUGGING_PORT=(int, 9222),
+    SELENIUM_WORKER_MAX_RETRIES=(int, 3),
+    SELENIUM_WORKER_RETRY_DELAY=(int, 10),
+    SELENIUM_WORKER_PREFETCH=(int, 4),
+    SELENIUM_WORKER_RESULTS_BATCH_SIZE=(int, 20),
+    SELENIUM_WORKER_RESULTS_FLUSH_INTERVAL=(float, 1.0),
+    SELENIUM_WORKER_CACHE_TTL=(int, 300),
+    SELENIUM_WORKER_CACHE_SIZE=(int, 10000),
+    SELENIUM_WORKER_HTTP_TIMEOUT=(int, 10),
+    SELENIUM_WORKER_DOMAIN_RATE=(float, 1.0),
+    SELENIUM_WORKER_DOMAIN_BURST=(int, 2),
+    SELENIUM_WORKER_METRICS_PORT=(int, 9100),
+    PROXY_HEALTH_CACHE_PATH=(str, '/tmp/proxy_health.json'),
+    PROXY_HEALTH_INTERVAL=(int, 60),
+    PROXY_HEALTH_MAX_AGE=(int, 600),
+    PROXY_HEALTH_TIMEOUT=(int, 10),
 )
 
 DEBUG = env('DJANGO_DEBUG')
 USE_PROXY = env('USE_PROXY')
 HEADLESS_SELENIUM_PARSERS = env('HEADLESS_SELENIUM_PARSERS')
+# max seconds to wait for page readiness after navigation
+PAGE_WAIT_TIMEOUT = env('PAGE_WAIT_TIMEOUT')
+# long living chrome is restarted after pages count, age in seconds or process tree rss, 0 disables the limit
+CHROME_RECYCLE_PAGES = env('CHROME_RECYCLE_PAGES')
+CHROME_RECYCLE_AGE = env('CHROME_RECYCLE_AGE')
+CHROME_RECYCLE_RSS_MB = env('CHROME_RECYCLE_RSS_MB')
+# images, media, fonts and trackers are not loaded by parsers, see utils/blocking.py
+CHROME_BLOCK_RESOURCES = env('CHROME_BLOCK_RESOURCES')
+# lean mode limits renderer processes and js heap, disables gpu and background networking
+CHROME_LEAN_MODE = env('CHROME_LEAN_MODE')
+CHROME_JS_HEAP_MB = env('CHROME_JS_HEAP_MB')
+CHROME_RENDERER_PROCESS_LIMIT = env('CHROME_RENDERER_PROCESS_LIMIT')
+# persistent chrome profiles are kept in this dir, empty value starts chrome with a fresh incognito profile
+CHROME_PROFILES_DIR = env('CHROME_PROFILES_DIR')
+CHROME_PROFILE_MAX_MB = env('CHROME_PROFILE_MAX_MB')
+CHROME_DISK_CACHE_MB = env('CHROME_DISK_CACHE_MB')
+# remote webdriver endpoints separated by comma, like http://selenium-hub:4444/wd/hub,http://chromedriver:9515
+# chrome is started by the least loaded of them, local chrome is used if the list is empty
+WEBDRIVER_REMOTE_URLS = env.list('WEBDRIVER_REMOTE_URLS', default=[])
+WEBDRIVER_STATUS_TIMEOUT = env('WEBDRIVER_STATUS_TIMEOUT')
+# sessions which standalone chromedriver endpoint runs at once, grid reports its capacity itself
+WEBDRIVER_STANDALONE_CAPACITY = env('WEBDRIVER_STANDALONE_CAPACITY')
+# html of crawled pages is archived in this dir for offline parsing, empty value disables the archive
+SNAPSHOTS_DIR = env('SNAPSHOTS_DIR')
+SNAPSHOTS_MAX_AGE_DAYS = env('SNAPSHOTS_MAX_AGE_DAYS')
+SNAPSHOTS_MAX_MB = env('SNAPSHOTS_MAX_MB')
 
 FACEBOOK_SCREENSHOTS_DIR = env('FACEBOOK_SCREENSHOTS_DIR')
 FACEBOOK_PID_PATH = env('FACEBOOK_PID_PATH')
+# incremental crawl refreshes posts published during the last hours
+FACEBOOK_REFRESH_WINDOW_HOURS = env('FACEBOOK_REFRESH_WINDOW_HOURS')
+# cron parsers split links between shards processes, every shard runs chrome on debugging port + shard number
+FACEBOOK_SHARDS = env('FACEBOOK_SHARDS')
+FACEBOOK_DEBUGGING_PORT = env('FACEBOOK_DEBUGGING_PORT')
 
 OK_PID_PATH = env('OK_PID_PATH')
 OK_PROXY_IP = env('OK_PROXY_IP')
 OK_PROXY_PORT = env('OK_PROXY_PORT')
 OK_SCREENSHOTS_DIR = env('OK_SCREENSHOTS_DIR')
+OK_SHARDS = env('OK_SHARDS')
+OK_DEBUGGING_PORT = env('OK_DEBUGGING_PORT')
+# shards use these 'ip:port' proxies in turn, OK_PROXY_IP and OK_PROXY_PORT are used if it is empty
+OK_PROXIES = env.list('OK_PROXIES', default=[])
 
 TIKTOK_PROXY_IP = env('TIKTOK_PROXY_IP')
 TIKTOK_PROXY_PORT = env('TIKTOK_PROXY_PORT')
 TIKTOK_SCREENSHOTS_DIR = env('TIKTOK_SCREENSHOTS_DIR')
 TIKTOK_PID_PATH = env('TIKTOK_PID_PATH')
 TIKTOK_PARSER_LOG_FILE = env('TIKTOK_PARSER_LOG_FILE')
+TIKTOK_SHARDS = env('TIKTOK_SHARDS')
+TIKTOK_DEBUGGING_PORT = env('TIKTOK_DEBUGGING_PORT')
+TIKTOK_PROXIES = env.list('TIKTOK_PROXIES', default=[])
 
 SELENIUM_WORKER_PROXY_IP = env('SELENIUM_WORKER_PROXY_IP')
 SELENIUM_WORKER_PROXY_PORT = env('SELENIUM_WORKER_PROXY_PORT')
 SELENIUM_WORKER_PID_PATH = env('SELENIUM_WORKER_PID_PATH')
+# every consumer runs its own chrome, debugging ports are allocated sequentially from this one
+SELENIUM_WORKER_CONSUMERS = env('SELENIUM_WORKER_CONSUMERS')
+SELENIUM_WORKER_DEBUGGING_PORT = env('SELENIUM_WORKER_DEBUGGING_PORT')
+# failed messages are redelivered with exponential delay: delay, 2 * delay, 4 * delay... seconds
+SELENIUM_WORKER_MAX_RETRIES = env('SELENIUM_WORKER_MAX_RETRIES')
+SELENIUM_WORKER_RETRY_DELAY = env('SELENIUM_WORKER_RETRY_DELAY')
+# messages are acked after their results batch is written, so consumer should hold several of them
+SELENIUM_WORKER_PREFETCH = env('SELENIUM_WORKER_PREFETCH')
+SELENIUM_WORKER_RESULTS_BATCH_SIZE = env('SELENIUM_WORKER_RESULTS_BATCH_SIZE')
+SELENIUM_WORKER_RESULTS_FLUSH_INTERVAL = env('SELENIUM_WORKER_RESULTS_FLUSH_INTERVAL')
+# compare results of the same post are reused for ttl seconds, 0 disables the cache
+SELENIUM_WORKER_CACHE_TTL = env('SELENIUM_WORKER_CACHE_TTL')
+SELENIUM_WORKER_CACHE_SIZE = env('SELENIUM_WORKER_CACHE_SIZE')
+SELENIUM_WORKER_HTTP_TIMEOUT = env('SELENIUM_WORKER_HTTP_TIMEOUT')
+# requests per second to every second level domain, rates of particular domains
+# are set like SELENIUM_WORKER_DOMAIN_RATES=facebook.com=0.5;instagram.com=2, zero rate disables the limit
+SELENIUM_WORKER_DOMAIN_RATE = env('SELENIUM_WORKER_DOMAIN_RATE')
+SELENIUM_WORKER_DOMAIN_BURST = env('SELENIUM_WORKER_DOMAIN_BURST')
+SELENIUM_WORKER_DOMAIN_RATES = env.dict('SELENIUM_WORKER_DOMAIN_RATES', cast={'value': float}, default={})
+# port of prometheus /metrics endpoint, 0 disables it
+SELENIUM_WORKER_METRICS_PORT = env('SELENIUM_WORKER_METRICS_PORT')
 RABBIT_HOST = env('RABBIT_HOST')
 
+# proxies are probed in background every interval seconds, drivers read the cached status,
+# status older than max age is treated as unknown
+PROXY_HEALTH_CACHE_PATH = env('PROXY_HEALTH_CACHE_PATH')
+PROXY_HEALTH_INTERVAL = env('PROXY_HEALTH_INTERVAL')
+PROXY_HEALTH_MAX_AGE = env('PROXY_HEALTH_MAX_AGE')
+PROXY_HEALTH_TIMEOUT = env('PROXY_HEALTH_TIMEOUT')
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/83.0.4103.53 Safari/537.36'
+)
+
 
 class AccessStatus(Enum):
     success = 'success'
@@ -0,0 +1,94 @@
+"""
+Parsing of counters texts of all networks: '1 234', '1,2 тыс.', '15 млн', '1.2K', '3&nbsp;просмотра'.
+Number is read from the start of text, known suffix after it sets multiplier, other words are ignored
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List, Match, Optional
+
+MULTIPLIERS = {
+    'k': 10 ** 3,
+    'к': 10 ** 3,
+    'тыс': 10 ** 3,
+    'тысяча': 10 ** 3,
+    'тысячи': 10 ** 3,
+    'тысяч': 10 ** 3,
+    'm': 10 ** 6,
+    'м': 10 ** 6,
+    'млн': 10 ** 6,
+    'миллион': 10 ** 6,
+    'миллиона': 10 ** 6,
+    'миллионов': 10 ** 6,
+    'b': 10 ** 9,
+    'млрд': 10 ** 9,
+    'миллиард': 10 ** 9,
+    'миллиарда': 10 ** 9,
+    'миллиардов': 10 ** 9,
+}
+
+# html entity and unicode spaces are used by networks between digits groups and before suffixes
+SPACES = str.maketrans({'\xa0': ' ', '\u2009': ' ', '\u202f': ' '})
+
+# space separates digits groups only when exactly 3 digits follow it: '12 345' is one number,
+# '12 3456' is broken grouping and is not a counter at all
+COUNTER_PATTERN = (
+    r'(?P<integer>\d{1,3}(?: \d{3}(?!\d))+|\d+)'
+    r'(?:[.,](?P<fraction>\d+))?(?! ?\d)'
+    r' *(?:(?P<suffix>' + '|'.join(sorted(MULTIPLIERS, key=len, reverse=True)) + r')\.?(?!\w))?'
+)
+COUNTER_RE = re.compile(r'^[^\w]*' + COUNTER_PATTERN, re.IGNORECASE)
+# counter inside of label text, like 'Нравится 1,2 тыс. людям'
+COUNTER_SEARCH_RE = re.compile(r'(?<![\w.,])' + COUNTER_PATTERN, re.IGNORECASE)
+
+
+class CounterParseError(ValueError):
+    pass
+
+
+def _get_counter(match: Match) -> int:
+    """
+    Convert counter match to int, fraction without suffix is a digits group: '12,345' is 12345
+    """
+    integer = match.group('integer').replace(' ', '')
+    fraction = match.group('fraction') or ''
+    suffix = match.group('suffix')
+    if suffix is None:
+        return int(integer + fraction) if len(fraction) == 3 else int(integer)
+    multiplier = MULTIPLIERS[suffix.lower()]
+    # integer arithmetic, float of '4.35' multiplied by 1000 is 4349.999
+    return int(integer) * multiplier + int(fraction or 0) * multiplier // 10 ** len(fraction)
+
+
+@lru_cache(maxsize=4096)
+def parse_counter(text: str) -> int:
+    """
+    Parse counter at the start of text
+    """
+    match = COUNTER_RE.match(text.replace('&nbsp;', ' ').translate(SPACES))
+    if match is None:
+        raise CounterParseError(f'can not parse counter: {text}')
+    return _get_counter(match)
+
+
+@lru_cache(maxsize=1024)
+def find_counter(text: str) -> int:
+    """
+    Parse the first counter in text, words before it are skipped
+    """
+    match = COUNTER_SEARCH_RE.search(text.replace('&nbsp;', ' ').translate(SPACES))
+    if match is None:
+        raise CounterParseError(f'can not find counter: {text}')
+    return _get_counter(match)
+
+
+def parse_counters(texts: Iterable[Optional[str]], default: Optional[int] = None) -> List[Optional[int]]:
+    """
+    Parse counters texts of batched extraction by one pass, default is returned for texts without counter
+    """
+    counters = []
+    for text in texts:
+        try:
+            counters.append(parse_counter(text) if text is not None else default)
+        except CounterParseError:
+            counters.append(default)
+    return counters
@@ -1,6 +1,6 @@
 import datetime
 import os
-from typing import List
+from typing import Dict, List
 
 import psycopg2
 
@@ -31,6 +31,23 @@ def update_proxy_status(proxy_ip: str, status: AccessStatus) -> None:
     )
 
 
+def update_proxies_status(statuses: Dict[str, AccessStatus]) -> None:
+    """
+    Save health check results of several proxies by one connection,
+    date of last usage is not changed: proxy was checked, not used
+    """
+    connection = get_postgres_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.executemany(
+            'UPDATE api_facebookproxy SET last_usage_status=%(status)s WHERE ip=%(ip)s',
+            [{'ip': f'{ip}', 'status': f'{status}'} for ip, status in statuses.items()]
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
 def update_records(
         table: str,
         set_dict: dict,
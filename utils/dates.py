@@ -0,0 +1,94 @@
+"""
+Parsing of russian dates of posts without dateparser and locale:
+known format 'Понедельник, 6 апреля 2020 г. в 10:15' is parsed by one regexp and months table,
+dateparser is imported only when some string has unknown format
+"""
+import datetime
+import re
+from functools import lru_cache
+from typing import Optional, Union
+
+MONTHS = {
+    month: number
+    for number, names in enumerate((
+        ('января', 'январь', 'янв'),
+        ('февраля', 'февраль', 'фев'),
+        ('марта', 'март', 'мар'),
+        ('апреля', 'апрель', 'апр'),
+        ('мая', 'май'),
+        ('июня', 'июнь', 'июн'),
+        ('июля', 'июль', 'июл'),
+        ('августа', 'август', 'авг'),
+        ('сентября', 'сентябрь', 'сен', 'сент'),
+        ('октября', 'октябрь', 'окт'),
+        ('ноября', 'ноябрь', 'ноя'),
+        ('декабря', 'декабрь', 'дек'),
+    ), start=1)
+    for month in names
+}
+
+# weekday is optional, year suffix 'г.' and time are optional too
+RUSSIAN_DATE_RE = re.compile(
+    r'^\s*(?:[а-яё]+,\s*)?(?P<day>\d{1,2})\s+(?P<month>[а-яё]+)\.?\s+(?P<year>\d{4})'
+    r'(?:\s*г\.?)?(?:\s*(?:в\s*)?(?P<hour>\d{1,2}):(?P<minute>\d{2}))?\s*$',
+    re.IGNORECASE
+)
+
+DATEPARSER_FORMATS = ['%A, %d %B %Y г. в %H:%M']
+
+
+@lru_cache(maxsize=4096)
+def parse_russian_date(date_text: str) -> Optional[datetime.datetime]:
+    """
+    Parse date of known russian format, return None if format is unknown
+    """
+    match = RUSSIAN_DATE_RE.match(date_text)
+    if match is None:
+        return None
+    month = MONTHS.get(match.group('month').lower())
+    if month is None:
+        return None
+    try:
+        return datetime.datetime(
+            year=int(match.group('year')),
+            month=month,
+            day=int(match.group('day')),
+            hour=int(match.group('hour') or 0),
+            minute=int(match.group('minute') or 0),
+        )
+    except ValueError:
+        return None
+
+
+def parse_utime(utime: Union[str, int, None]) -> Optional[datetime.datetime]:
+    """
+    Parse unix time of data-utime attribute to local datetime
+    """
+    try:
+        return datetime.datetime.fromtimestamp(int(utime))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+@lru_cache(maxsize=1024)
+def parse_unknown_date(date_text: str) -> Optional[datetime.datetime]:
+    """
+    Parse date by dateparser, it is slow and heavy to import, so it is used for unknown formats only
+    """
+    import dateparser
+    return dateparser.parse(date_text, date_formats=DATEPARSER_FORMATS, languages=['ru'])
+
+
+def parse_date(
+        date_text: Optional[str],
+        utime: Union[str, int, None] = None
+) -> Optional[datetime.datetime]:
+    """
+    Parse post date by known format, then by unix time, then by dateparser
+    """
+    date = parse_russian_date(date_text) if date_text else None
+    if date is None:
+        date = parse_utime(utime)
+    if date is None and date_text:
+        date = parse_unknown_date(date_text)
+    return date
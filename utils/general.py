@@ -1,16 +1,21 @@
 import datetime
 import os
 from json.encoder import JSONEncoder
-from typing import TYPE_CHECKING, Optional
+from time import monotonic
+from typing import TYPE_CHECKING, List, Optional
 
-import requests
 from selenium import webdriver
 from selenium.webdriver import DesiredCapabilities, Proxy
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.proxy import ProxyType
 
-from selenium_parsers.facebook.utils.database import AccessStatus
-from selenium_parsers.utils.database import update_proxy_status
+from selenium_parsers.utils.blocking import setup_blocking
+from selenium_parsers.utils.cdp import PERFORMANCE_LOGGING_PREFS
+from selenium_parsers.utils.constants import USER_AGENT, CHROME_LEAN_MODE, CHROME_JS_HEAP_MB, \
+    CHROME_RENDERER_PROCESS_LIMIT, WEBDRIVER_REMOTE_URLS
+from selenium_parsers.utils.profiles import get_profile_dir, prepare_profile, get_profile_arguments
+from selenium_parsers.utils.proxy_health import get_proxy_status, ProxyUnavailableError
+from selenium_parsers.utils.remote import RemoteChrome, select_endpoint
 from selenium_parsers.utils.parsers_signals import terminate_old_process, save_driver_pid
 
 if TYPE_CHECKING:
@@ -40,6 +45,38 @@ def webdriver_singleton(func):
     return wrap
 
 
+# lean mode trades rendering features for memory, several parsers share one host
+LEAN_WINDOW_SIZE = '1280,800'
+LEAN_DISK_CACHE_MB = 16
+
+
+def get_lean_arguments(with_disk_cache: bool = True) -> List[str]:
+    """
+    Return chrome arguments of low memory mode
+    """
+    arguments = [
+        f'--renderer-process-limit={CHROME_RENDERER_PROCESS_LIMIT}',
+        # one renderer serves all sites of the tab
+        '--disable-features=site-per-process,TranslateUI,MediaRouter',
+        '--disable-site-isolation-trials',
+        '--disable-background-networking',
+        '--disable-component-update',
+        '--disable-default-apps',
+        '--disable-sync',
+        '--disable-breakpad',
+        '--no-first-run',
+        '--mute-audio',
+        '--disable-gpu',
+        '--disable-software-rasterizer',
+        '--disable-accelerated-2d-canvas',
+        f'--js-flags=--max-old-space-size={CHROME_JS_HEAP_MB}',
+        f'--window-size={LEAN_WINDOW_SIZE}',
+    ]
+    if with_disk_cache:
+        arguments.append(f'--disk-cache-size={LEAN_DISK_CACHE_MB * 1024 * 1024}')
+    return arguments
+
+
 def create_chrome_driver(
     pid_file_path: str,
     logger: 'Logger',
@@ -62,64 +99,81 @@ def get_tuned_driver(
         logger: 'Logger',
         proxy_ip: Optional[str] = None,
         proxy_port: Optional[str] = None,
-        headless: bool = True
+        headless: bool = True,
+        debugging_port: int = 9222,
+        blocking_profile: Optional[str] = None,
+        lean_mode: bool = CHROME_LEAN_MODE,
+        remote_urls: List[str] = WEBDRIVER_REMOTE_URLS
 ) -> 'WebDriver':
     os.environ["DISPLAY"] = ':99'
 
     chrome_options = Options()
 
-    capabilities = DesiredCapabilities.CHROME
-    capabilities['goog:loggingPrefs'] = {'browser': 'ALL'}
+    capabilities = DesiredCapabilities.CHROME.copy()
+    capabilities['goog:loggingPrefs'] = {'browser': 'ALL', 'performance': 'ALL'}
+    chrome_options.add_experimental_option('perfLoggingPrefs', PERFORMANCE_LOGGING_PREFS)
     if proxy_ip and proxy_port:
         prox = Proxy()
         prox.proxy_type = ProxyType.MANUAL
         prox.http_proxy = f"{proxy_ip}:{proxy_port}"
         prox.ssl_proxy = f"{proxy_ip}:{proxy_port}"
-        try:
-            response = requests.get(
-                'https://google.com',
-                proxies={
-                    'http': f'{proxy_ip}:{proxy_port}',
-                    'https': f'{proxy_ip}:{proxy_port}',
-                }
-            )
-        except requests.RequestException:
-            update_proxy_status(proxy_ip, AccessStatus.fail)
-            raise
-        if response.status_code != 200:
-            update_proxy_status(proxy_ip, AccessStatus.fail)
-            logger.critical(f'proxy {proxy_ip}:{proxy_port} not work')
-            exit(-1)
-        update_proxy_status(proxy_ip, AccessStatus.success)
+        proxy_status = get_proxy_status(proxy_ip, proxy_port)
+        if proxy_status is None:
+            logger.warning(f'proxy {proxy_ip}:{proxy_port} status is unknown, health checker may be not running')
+        elif not proxy_status['alive']:
+            logger.critical(f'proxy {proxy_ip}:{proxy_port} not work: {proxy_status["error"]}')
+            raise ProxyUnavailableError(f'{proxy_ip}:{proxy_port}')
+        else:
+            logger.info(f'proxy {proxy_ip}:{proxy_port} latency {proxy_status["latency"]}s')
         prox.add_to_capabilities(capabilities)
 
         logger.info(f'{parser_name} use proxy: {proxy_ip}:{proxy_port}')
+
+    # profiles of remote chrome are on its node
+    profile_dir = None if remote_urls else get_profile_dir(parser_name, proxy_ip, proxy_port, debugging_port)
+    if profile_dir:
+        is_warm_profile = prepare_profile(profile_dir, logger)
+        for argument in get_profile_arguments(profile_dir):
+            chrome_options.add_argument(argument)
+        logger.info(f'{parser_name} use {"warm" if is_warm_profile else "new"} profile {profile_dir}')
+
+    prefs = {"profile.default_content_setting_values.notifications": 2}
+    chrome_options.add_experimental_option('prefs', prefs)
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    if not profile_dir:
+        chrome_options.add_argument('incognito')
+    if lean_mode:
+        for argument in get_lean_arguments(with_disk_cache=not profile_dir):
+            chrome_options.add_argument(argument)
+        logger.info(f'{parser_name} chrome is started in lean mode')
+    else:
+        chrome_options.add_argument('start-maximized')
+
     if headless:
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--remote-debugging-port=9222")
+        if not remote_urls:
+            chrome_options.add_argument(f"--remote-debugging-port={debugging_port}")
         chrome_options.add_argument("--disable-infobars")
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--no-sandbox")
 
-        driver = webdriver.Chrome(
+    start = monotonic()
+    if remote_urls:
+        remote_url = select_endpoint(remote_urls)
+        driver = RemoteChrome(
+            command_executor=remote_url,
             options=chrome_options,
             desired_capabilities=capabilities
         )
+        logger.info(f'{parser_name} use remote webdriver {remote_url}')
     else:
         driver = webdriver.Chrome(
             options=chrome_options,
             desired_capabilities=capabilities
         )
 
-    prefs = {"profile.default_content_setting_values.notifications": 2}
-    chrome_options.add_experimental_option('prefs', prefs)
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-    chrome_options.add_argument('start-maximized')
-    chrome_options.add_argument('incognito')
-
     driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
         "source": """
         Object.defineProperty(navigator, 'webdriver', {
@@ -135,9 +189,12 @@ def get_tuned_driver(
     })
 
     driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-        "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
-                     'Chrome/83.0.4103.53 Safari/537.36'
+        "userAgent": USER_AGENT
     })
 
+    if blocking_profile:
+        setup_blocking(driver, blocking_profile, logger)
+    logger.info(f'{parser_name} chrome is started in {monotonic() - start:.2f}s')
+
     driver.implicitly_wait(5)
     return driver
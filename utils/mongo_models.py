@@ -1,4 +1,14 @@
 import datetime
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, Sequence
+
+import pymongo
+from pymongo.errors import OperationFailure
+
+if TYPE_CHECKING:
+    from logging import Logger
+    from pymongo.collection import Collection
+
+DUPLICATE_KEY_ERROR = 11000
 
 
 class MongoField:
@@ -84,14 +94,27 @@ class MongoModel:
     def get_data(self):
         return self._data
 
-    def save(self, collection):
+    def validate(self):
         for key, value in self._data.items():
             field = getattr(self, f'_attr__{key}')
             if field.is_required and value is None:
                 raise AttributeError(f'Field {key} - is required')
 
+    def save(self, collection):
+        self.validate()
         collection.insert_one(self._data)
 
+    def get_upsert(self, key_fields):
+        """
+        Return bulk write operation which inserts document or updates the one with the same key fields
+        """
+        self.validate()
+        return pymongo.UpdateOne(
+            {key: self._data[key] for key in key_fields},
+            {'$set': self._data},
+            upsert=True
+        )
+
 
 class BaseClubModel(MongoModel):
     club_id = MongoStrField(required=True)
@@ -121,8 +144,62 @@ class FacebookPageData(BaseClubModel):
     posts_likes = MongoIntField()
     comments_count = MongoIntField()
     shares_count = MongoIntField()
+    # full or incremental, posts counters are totals over saved posts of club in both modes
+    crawl_mode = MongoStrField()
 
 
 class FacebookPostData(BasePostModel):
+    # posts are upserted by this key, see bulk_upsert; posts saved before it have no post id version,
+    # their ids are not unique and they are kept out of the unique index
+    unique_key = ('club_id', 'post_id', 'post_id_version')
+    unique_filter = {'post_id_version': {'$exists': True}}
+
     post_id = MongoStrField()
+    post_id_version = MongoIntField()
     post_img = MongoStrField()
+
+
+class BulkUpsertResult(NamedTuple):
+    inserted: int
+    updated: int
+
+
+def bulk_upsert(
+        collection: 'Collection',
+        models: Iterable[MongoModel],
+        key_fields: Sequence[str]
+) -> BulkUpsertResult:
+    """
+    Write models by one unordered bulk of upserts, models with the same key are written once (the last wins)
+    """
+    unique_models = {tuple(model.get_data()[key] for key in key_fields): model for model in models}
+    if not unique_models:
+        return BulkUpsertResult(0, 0)
+    result = collection.bulk_write(
+        [model.get_upsert(key_fields) for model in unique_models.values()],
+        ordered=False
+    )
+    return BulkUpsertResult(result.upserted_count, result.matched_count)
+
+
+def ensure_unique_index(
+        collection: 'Collection',
+        key_fields: Sequence[str],
+        logger: 'Logger',
+        partial_filter: Optional[dict] = None
+) -> None:
+    """
+    Create unique index of key fields, partial filter limits it to documents written with the key.
+    Documents are never removed here: when duplicates exist, index is not created and error is logged
+    """
+    index = [(key, pymongo.ASCENDING) for key in key_fields]
+    extra_params = {'partialFilterExpression': partial_filter} if partial_filter else {}
+    try:
+        collection.create_index(index, unique=True, **extra_params)
+    except OperationFailure as e:
+        if e.code != DUPLICATE_KEY_ERROR:
+            raise
+        logger.error(
+            f'unique index {list(key_fields)} of {collection.name} is not created, duplicates exist',
+            exc_info=True
+        )
@@ -2,7 +2,7 @@ import logging
 import os
 import signal
 from pathlib import Path
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Callable, List
 
 import psutil
 
@@ -19,6 +19,9 @@ def terminate_old_process(pid_file_path: str) -> None:
         for pid in f.readlines():
             try:
                 pid = int(pid)
+                if pid == os.getpid():
+                    # driver of this process is restarted
+                    continue
                 logger.info(f'try to terminate process pid={pid}')
                 os.kill(pid, signal.SIGTERM)
             except ProcessLookupError:
@@ -29,13 +32,42 @@ def terminate_old_process(pid_file_path: str) -> None:
                 logger.warning(f'process with pid={pid} was terminated by timeout')
 
 
-def save_driver_pid(driver: 'WebDriver', file_path: str) -> None:
-    chrom_process = psutil.Process(driver.service.process.pid)
+def get_driver_processes(driver: 'WebDriver') -> List[psutil.Process]:
+    """
+    Return chromedriver process and all chrome processes started by it,
+    remote driver has no local processes
+    """
+    service = getattr(driver, 'service', None)
+    if service is None or service.process is None:
+        return []
+    chrom_process = psutil.Process(service.process.pid)
+    return [chrom_process] + chrom_process.children(recursive=True)
+
+
+def get_driver_rss(driver: 'WebDriver') -> int:
+    """
+    Return resident memory of driver process tree in bytes
+    """
+    rss = 0
+    for proc in get_driver_processes(driver):
+        try:
+            rss += proc.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return rss
+
+
+def save_driver_pid(driver: 'WebDriver', file_path: str, with_script_pid: bool = True) -> None:
+    """
+    Save pids of driver processes, pid of python script is saved too unless the script
+    runs several drivers and must survive restart of any of them
+    """
+    processes = get_driver_processes(driver)
     with open(file_path, 'w') as f:
-        python_script_pid = os.getpid()
-        f.write(f'{python_script_pid}\n')
-        f.write(f'{chrom_process.pid}\n')
-        for proc in chrom_process.children(recursive=True):
+        if with_script_pid:
+            python_script_pid = os.getpid()
+            f.write(f'{python_script_pid}\n')
+        for proc in processes:
             f.write(f'{proc.pid}\n')
 
 
@@ -5,11 +5,16 @@ import string
 from selenium_parsers.utils.general import get_tuned_driver
 
 from selenium_parsers.utils.constants import USE_PROXY, DEBUG
+from selenium_parsers.utils.parsers_signals import terminate_old_process, save_driver_pid
+from selenium_parsers.utils.recycling import DriverRecycler
+from selenium_parsers.utils.sharding import get_shard_pid_path
 
 
 class BaseParser:
-    def __init__(self):
-        self._setup_driver()
+    def __init__(self, shard_id: int = 0):
+        self._shard_id = shard_id
+        self._recycler = DriverRecycler(self._create_driver, self._logger)
+        self._recycler.start()
 
     @property
     def parser_name(self):
@@ -32,6 +37,20 @@ class BaseParser:
         """
         raise NotImplementedError()
 
+    @property
+    def _proxies(self):
+        """
+        Set list of 'ip:port' proxies, shards use them in turn, parser proxy is used if it is empty
+        """
+        return []
+
+    @property
+    def _debugging_port(self):
+        """
+        Set chrome debugging port of the first shard, next shards use next ports
+        """
+        return 9222
+
     @property
     def _logger(self):
         """
@@ -39,20 +58,59 @@ class BaseParser:
         """
         raise NotImplementedError()
 
-    def _setup_driver(self):
+    @property
+    def _pid_path(self):
+        """
+        Set selenium parser pid file path, pid file is not used if it is None
+        """
+        return None
+
+    @property
+    def _blocking_profile(self):
+        """
+        Set name of resource blocking profile, all resources are loaded if it is None
+        """
+        return None
+
+    @property
+    def _driver(self):
+        return self._recycler.driver
+
+    def _create_driver(self):
         """
         Prepare selenium driver
         """
         extra_params = {}
         if USE_PROXY:
-            extra_params.update(proxy_ip=self._proxy_ip, proxy_port=self._proxy_port)
+            proxy_ip, proxy_port = self._get_proxy()
+            extra_params.update(proxy_ip=proxy_ip, proxy_port=proxy_port)
 
-        self._driver = get_tuned_driver(
+        pid_path = get_shard_pid_path(self._pid_path, self._shard_id) if self._pid_path else None
+        if pid_path:
+            terminate_old_process(pid_path)
+        driver = get_tuned_driver(
             parser_name=self.parser_name,
             logger=self._logger,
             headless=(not DEBUG),
+            debugging_port=self._debugging_port + self._shard_id,
+            blocking_profile=self._blocking_profile,
             **extra_params
         )
+        if pid_path:
+            save_driver_pid(driver, pid_path)
+        return driver
+
+    def _get_proxy(self):
+        if self._proxies:
+            proxy_ip, proxy_port = self._proxies[self._shard_id % len(self._proxies)].split(':')
+            return proxy_ip, proxy_port
+        return self._proxy_ip, self._proxy_port
+
+    def page_done(self):
+        """
+        Count parsed page, driver is restarted between pages when it is time to
+        """
+        self._recycler.page_done()
 
     @property
     def screenshot_dir(self):
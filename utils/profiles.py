@@ -0,0 +1,127 @@
+"""
+Persistent chrome profiles: static bundles, cookies and consent choices survive between runs,
+every parser and proxy pair has its own profile directory
+"""
+import json
+import os
+import re
+import shutil
+from typing import TYPE_CHECKING, List, Optional
+
+import psutil
+
+from selenium_parsers.utils.constants import CHROME_PROFILES_DIR, CHROME_PROFILE_MAX_MB, CHROME_DISK_CACHE_MB
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+MB = 1024 * 1024
+
+# chrome marks profile as used by a running process with these files,
+# they are left behind when chrome is killed
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def get_profile_dir(
+        parser_name: str,
+        proxy_ip: Optional[str] = None,
+        proxy_port: Optional[str] = None,
+        debugging_port: int = 9222
+) -> Optional[str]:
+    """
+    Return profile directory of parser, None if persistent profiles are disabled.
+    Drivers started at the same time use different debugging ports, so port is a part of the name
+    """
+    if not CHROME_PROFILES_DIR:
+        return None
+    name = f'{parser_name}_{proxy_ip or "direct"}_{proxy_port or ""}_{debugging_port}'
+    return os.path.join(CHROME_PROFILES_DIR, re.sub(r'[^\w.-]+', '_', name))
+
+
+def get_dir_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def get_profile_processes(profile_dir: str) -> List[psutil.Process]:
+    """
+    Return chrome processes which still use profile directory
+    """
+    processes = []
+    for process in psutil.process_iter(['cmdline']):
+        if f'--user-data-dir={profile_dir}' in (process.info['cmdline'] or ()):
+            processes.append(process)
+    return processes
+
+
+def release_profile(profile_dir: str, logger: 'Logger', timeout: float = 5) -> None:
+    """
+    Wait for chrome of terminated parser and kill it if it is still alive,
+    two browsers can not use the same profile
+    """
+    processes = get_profile_processes(profile_dir)
+    if not processes:
+        return
+    logger.warning(f'profile {profile_dir} is used by {len(processes)} processes, wait for them')
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for process in alive:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+
+def mark_clean_exit(profile_dir: str) -> None:
+    """
+    Killed chrome leaves profile in crashed state, and restore session bubble is shown on start
+    """
+    preferences_path = os.path.join(profile_dir, 'Default', 'Preferences')
+    try:
+        with open(preferences_path, 'r') as f:
+            preferences = json.load(f)
+    except (OSError, ValueError):
+        return
+    profile = preferences.setdefault('profile', {})
+    if profile.get('exit_type') == 'Normal' and profile.get('exited_cleanly', True):
+        return
+    profile['exit_type'] = 'Normal'
+    profile['exited_cleanly'] = True
+    with open(preferences_path, 'w') as f:
+        json.dump(preferences, f)
+
+
+def prepare_profile(profile_dir: str, logger: 'Logger', max_size_mb: int = CHROME_PROFILE_MAX_MB) -> bool:
+    """
+    Make profile directory ready for chrome start, return True if profile is warm.
+    Profile larger than max size is removed, its cache is downloaded again
+    """
+    release_profile(profile_dir, logger)
+    if os.path.isdir(profile_dir):
+        size_mb = get_dir_size(profile_dir) / MB
+        if max_size_mb and size_mb > max_size_mb:
+            logger.info(f'profile {profile_dir} size is {size_mb:.0f}MB, it is removed')
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    is_warm = os.path.isdir(profile_dir)
+    os.makedirs(profile_dir, exist_ok=True)
+    for file_name in SINGLETON_FILES:
+        try:
+            os.remove(os.path.join(profile_dir, file_name))
+        except FileNotFoundError:
+            pass
+    mark_clean_exit(profile_dir)
+    return is_warm
+
+
+def get_profile_arguments(profile_dir: str, disk_cache_mb: int = CHROME_DISK_CACHE_MB) -> List[str]:
+    return [
+        f'--user-data-dir={profile_dir}',
+        f'--disk-cache-dir={os.path.join(profile_dir, "cache")}',
+        f'--disk-cache-size={disk_cache_mb * MB}',
+    ]
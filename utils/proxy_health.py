@@ -0,0 +1,162 @@
+"""
+Background proxy health checker: proxies are probed on interval,
+their status and latency are cached in a json file, which is read on driver startup
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from selenium_parsers.facebook.utils.database import get_facebook_proxies
+from selenium_parsers.utils.constants import AccessStatus, USE_PROXY, OK_PROXY_IP, OK_PROXY_PORT, TIKTOK_PROXY_IP, \
+    TIKTOK_PROXY_PORT, SELENIUM_WORKER_PROXY_IP, SELENIUM_WORKER_PROXY_PORT, PROXY_HEALTH_CACHE_PATH, \
+    PROXY_HEALTH_INTERVAL, PROXY_HEALTH_MAX_AGE, PROXY_HEALTH_TIMEOUT
+from selenium_parsers.utils.database import update_proxies_status
+from selenium_parsers.utils.parsers_signals import setup_signals_handlers
+from selenium_parsers.utils.selenium_loggers import setup_logger
+
+logger = logging.getLogger('proxy_health')
+
+PROBE_URL = 'https://google.com'
+
+
+class ProxyUnavailableError(Exception):
+    """
+    Raise when proxy did not pass the last health check
+    """
+
+
+def get_proxy_key(proxy_ip: str, proxy_port: str) -> str:
+    return f'{proxy_ip}:{proxy_port}'
+
+
+def read_health_cache(cache_path: str = PROXY_HEALTH_CACHE_PATH) -> Dict[str, dict]:
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_proxy_status(
+        proxy_ip: str,
+        proxy_port: str,
+        max_age: int = PROXY_HEALTH_MAX_AGE,
+        cache_path: str = PROXY_HEALTH_CACHE_PATH
+) -> Optional[dict]:
+    """
+    Return cached proxy status, None if proxy was not checked recently
+    """
+    status = read_health_cache(cache_path).get(get_proxy_key(proxy_ip, proxy_port))
+    if status is None or time.time() - status['checked'] > max_age:
+        return None
+    return status
+
+
+def probe_proxy(proxy_ip: str, proxy_port: str, timeout: int = PROXY_HEALTH_TIMEOUT) -> dict:
+    """
+    Request probe url through proxy
+    """
+    proxy = get_proxy_key(proxy_ip, proxy_port)
+    start = time.monotonic()
+    try:
+        response = requests.get(PROBE_URL, proxies={'http': proxy, 'https': proxy}, timeout=timeout)
+    except requests.RequestException as e:
+        alive, error = False, repr(e)
+    else:
+        alive = response.status_code == 200
+        error = None if alive else f'status code {response.status_code}'
+    return {
+        'ip': proxy_ip,
+        'port': proxy_port,
+        'alive': alive,
+        'latency': round(time.monotonic() - start, 3),
+        'error': error,
+        'checked': time.time(),
+    }
+
+
+def get_known_proxies() -> List[Tuple[str, str]]:
+    """
+    Return proxies of all parsers
+    """
+    proxies = [
+        (OK_PROXY_IP, OK_PROXY_PORT),
+        (TIKTOK_PROXY_IP, TIKTOK_PROXY_PORT),
+        (SELENIUM_WORKER_PROXY_IP, SELENIUM_WORKER_PROXY_PORT),
+    ]
+    try:
+        proxies.extend(get_facebook_proxies())
+    except Exception:
+        logger.error('can not load facebook proxies', exc_info=True)
+    unique_proxies = []
+    for proxy_ip, proxy_port in proxies:
+        proxy = (str(proxy_ip), str(proxy_port))
+        if proxy_ip and proxy_port and proxy not in unique_proxies:
+            unique_proxies.append(proxy)
+    return unique_proxies
+
+
+def write_health_cache(statuses: Dict[str, dict], cache_path: str = PROXY_HEALTH_CACHE_PATH) -> None:
+    """
+    Replace cache file atomically, readers never see partially written file
+    """
+    tmp_path = f'{cache_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(statuses, f)
+    os.replace(tmp_path, cache_path)
+
+
+def check_proxies() -> Dict[str, dict]:
+    """
+    Probe all proxies concurrently, save statuses to cache file and database
+    """
+    proxies = get_known_proxies()
+    if not proxies:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(proxies), 8)) as executor:
+        results = list(executor.map(lambda proxy: probe_proxy(*proxy), proxies))
+    statuses = {get_proxy_key(result['ip'], result['port']): result for result in results}
+    write_health_cache(statuses)
+
+    for result in results:
+        if result['alive']:
+            logger.info(f'proxy {result["ip"]}:{result["port"]} is alive, latency {result["latency"]}s')
+        else:
+            logger.critical(f'proxy {result["ip"]}:{result["port"]} not work: {result["error"]}')
+    try:
+        update_proxies_status({
+            result['ip']: AccessStatus.success if result['alive'] else AccessStatus.fail
+            for result in results
+        })
+    except Exception:
+        logger.error('can not update proxies status in database', exc_info=True)
+    return statuses
+
+
+def run_forever(stop_event: threading.Event, interval: int = PROXY_HEALTH_INTERVAL) -> None:
+    while not stop_event.is_set():
+        try:
+            check_proxies()
+        except Exception:
+            logger.error('proxies check failed', exc_info=True)
+        stop_event.wait(interval)
+
+
+if __name__ == '__main__':
+    setup_logger(
+        log_file=os.environ.get('PROXY_HEALTH_LOG_FILE'),
+        logger_name='proxy_health'
+    )
+    if not USE_PROXY:
+        logger.info('proxies are not used, health checker is not needed')
+        exit(0)
+
+    checker_stop_event = threading.Event()
+    setup_signals_handlers(lambda sig_numb, frame: checker_stop_event.set())
+    run_forever(checker_stop_event)
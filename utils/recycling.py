@@ -0,0 +1,109 @@
+"""
+Chrome memory grows with every visited page, long living drivers are restarted between tasks
+"""
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Optional
+
+import psutil
+from selenium.common.exceptions import WebDriverException
+
+from selenium_parsers.utils.constants import CHROME_RECYCLE_PAGES, CHROME_RECYCLE_AGE, CHROME_RECYCLE_RSS_MB
+from selenium_parsers.utils.parsers_signals import get_driver_rss
+
+if TYPE_CHECKING:
+    from logging import Logger
+    from selenium.webdriver.chrome.webdriver import WebDriver
+
+MB = 1024 * 1024
+
+
+class DriverRecycler:
+    """
+    Own the driver and restart it after max_pages pages, after max_age seconds
+    or when chrome process tree rss exceeds max_rss_mb, zero value disables the limit
+    """
+    def __init__(
+            self,
+            start_driver: Callable[[], 'WebDriver'],
+            logger: 'Logger',
+            max_pages: int = CHROME_RECYCLE_PAGES,
+            max_age: int = CHROME_RECYCLE_AGE,
+            max_rss_mb: int = CHROME_RECYCLE_RSS_MB
+    ):
+        self._start_driver = start_driver
+        self._logger = logger
+        self._max_pages = max_pages
+        self._max_age = max_age
+        self._max_rss_mb = max_rss_mb
+        self._driver: Optional['WebDriver'] = None
+        self._started = 0.0
+        self._pages = 0
+        self._peak_rss_mb = 0.0
+
+    @property
+    def driver(self) -> 'WebDriver':
+        if self._driver is None:
+            self.start()
+        return self._driver
+
+    def start(self) -> None:
+        """
+        Start new driver, driver factory is responsible for the pid file
+        """
+        self._driver = self._start_driver()
+        self._started = monotonic()
+        self._pages = 0
+        self._peak_rss_mb = 0.0
+
+    def get_rss_mb(self) -> float:
+        if self._driver is None:
+            return 0
+        try:
+            return get_driver_rss(self._driver) / MB
+        except psutil.Error:
+            return 0
+
+    def get_recycle_reason(self, rss_mb: Optional[float] = None) -> Optional[str]:
+        if self._driver is None:
+            return None
+        if self._max_pages and self._pages >= self._max_pages:
+            return f'{self._pages} pages were loaded'
+        age = monotonic() - self._started
+        if self._max_age and age >= self._max_age:
+            return f'driver age is {age:.0f}s'
+        if self._max_rss_mb:
+            if rss_mb is None:
+                rss_mb = self.get_rss_mb()
+            if rss_mb >= self._max_rss_mb:
+                return f'chrome rss is {rss_mb:.0f}MB'
+        return None
+
+    def page_done(self) -> None:
+        """
+        Count loaded page and restart driver if it is time to,
+        call it between tasks only: the page is lost on restart
+        """
+        self._pages += 1
+        rss_mb = self.get_rss_mb()
+        self._peak_rss_mb = max(self._peak_rss_mb, rss_mb)
+        self._logger.info(f'chrome rss after page {self._pages}: {rss_mb:.0f}MB, peak: {self._peak_rss_mb:.0f}MB')
+        reason = self.get_recycle_reason(rss_mb)
+        if reason:
+            self.restart(reason)
+
+    def restart(self, reason: str) -> None:
+        self._logger.info(
+            f'restart chrome, {reason}; pages: {self._pages}, age: {monotonic() - self._started:.0f}s, '
+            f'rss: {self.get_rss_mb():.0f}MB, peak rss: {self._peak_rss_mb:.0f}MB'
+        )
+        self.quit()
+        self.start()
+
+    def quit(self) -> None:
+        if self._driver is None:
+            return
+        try:
+            self._driver.quit()
+        except WebDriverException:
+            self._logger.warning('can not quit chrome', exc_info=True)
+        self._driver = None
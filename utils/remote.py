@@ -0,0 +1,83 @@
+"""
+Remote webdriver backend: chrome runs on selenium grid or standalone chromedriver nodes,
+endpoint is chosen by its load
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import requests
+from selenium import webdriver
+
+from selenium_parsers.utils.constants import WEBDRIVER_REMOTE_URLS, WEBDRIVER_STATUS_TIMEOUT, \
+    WEBDRIVER_STANDALONE_CAPACITY
+
+logger = logging.getLogger(__name__)
+
+
+class NoRemoteEndpointError(Exception):
+    """
+    Raise when no remote webdriver endpoint is ready for a new session
+    """
+
+
+class RemoteChrome(webdriver.Remote):
+    """
+    Remote driver with chromedriver devtools command, so cdp tweaks work as with local chrome
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.command_executor._commands['executeCdpCommand'] = ('POST', '/session/$sessionId/goog/cdp/execute')
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: dict) -> dict:
+        return self.execute('executeCdpCommand', {'cmd': cmd, 'params': cmd_args})['value']
+
+
+def get_endpoint_load(
+        url: str,
+        timeout: float = WEBDRIVER_STATUS_TIMEOUT,
+        standalone_capacity: int = WEBDRIVER_STANDALONE_CAPACITY
+) -> Optional[Tuple[int, int]]:
+    """
+    Return (busy sessions, capacity) of endpoint, None if endpoint is not ready.
+    Standalone chromedriver does not report its capacity, configured one is returned
+    """
+    url = url.rstrip('/')
+    try:
+        status = requests.get(f'{url}/status', timeout=timeout).json()['value']
+    except (requests.RequestException, ValueError, KeyError):
+        logger.warning(f'can not get status of webdriver {url}', exc_info=True)
+        return None
+    if not status.get('ready', False):
+        return None
+
+    # selenium grid 4 describes every slot of its nodes
+    if 'nodes' in status:
+        slots = [slot for node in status['nodes'] for slot in node.get('slots', [])]
+        busy = sum(1 for slot in slots if slot.get('session'))
+        return busy, len(slots)
+
+    try:
+        sessions = requests.get(f'{url}/sessions', timeout=timeout).json()['value']
+    except (requests.RequestException, ValueError, KeyError):
+        sessions = []
+    return len(sessions), standalone_capacity
+
+
+def select_endpoint(urls: List[str] = WEBDRIVER_REMOTE_URLS) -> str:
+    """
+    Return ready endpoint with the lowest share of busy sessions, full endpoints are skipped
+    """
+    loads = []
+    for url in urls:
+        load = get_endpoint_load(url)
+        if load is None:
+            continue
+        busy, capacity = load
+        if busy >= capacity:
+            continue
+        loads.append((busy / capacity, url))
+    if not loads:
+        raise NoRemoteEndpointError(f'no ready webdriver among {", ".join(urls)}')
+    load, url = min(loads)
+    logger.info(f'webdriver {url} is selected, load {load:.2f}')
+    return url
@@ -0,0 +1,133 @@
+"""
+Infinite scroll driven by in-page MutationObserver: appended items are counted in the page,
+scrolling stops when no items were appended during quiet window
+"""
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from logging import Logger
+    from selenium.webdriver.chrome.webdriver import WebDriver
+
+START_OBSERVER_SCRIPT = """
+const selector = arguments[0];
+if (window.__scrollObserver) {
+    window.__scrollObserver.disconnect();
+}
+const state = {added: 0, total: document.querySelectorAll(selector).length};
+window.__scrollState = state;
+window.__scrollObserver = new MutationObserver(mutations => {
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (node.nodeType !== Node.ELEMENT_NODE) {
+                continue;
+            }
+            const count = (node.matches(selector) ? 1 : 0) + node.querySelectorAll(selector).length;
+            state.added += count;
+            state.total += count;
+        }
+    }
+});
+window.__scrollObserver.observe(document.body, {childList: true, subtree: true});
+return state.total;
+"""
+
+# scroll to the bottom and wait until the first appended item or the end of quiet window,
+# stop condition is true when the last element matching stop selector has attribute value below the limit
+SCROLL_SCRIPT = """
+const [quietMs, stopSelector, stopAttribute, stopBelow] = arguments;
+const callback = arguments[arguments.length - 1];
+const state = window.__scrollState;
+const before = state.added;
+const start = performance.now();
+window.scrollTo(0, document.body.scrollHeight);
+const isStopped = () => {
+    if (!stopSelector) {
+        return false;
+    }
+    const elements = document.querySelectorAll(stopSelector);
+    return elements.length > 0 && Number(elements[elements.length - 1].getAttribute(stopAttribute)) < stopBelow;
+};
+const check = () => {
+    const waited = performance.now() - start;
+    if (state.added > before || waited >= quietMs) {
+        callback({added: state.added - before, total: state.total, waited: waited, stopped: isStopped()});
+    } else {
+        setTimeout(check, 50);
+    }
+};
+check();
+"""
+
+STOP_OBSERVER_SCRIPT = """
+if (window.__scrollObserver) {
+    window.__scrollObserver.disconnect();
+    window.__scrollObserver = null;
+}
+"""
+
+
+class ScrollStats(NamedTuple):
+    iterations: int
+    items: int
+    added: int
+    elapsed: float
+    stop_reason: str
+
+
+def scroll_until_loaded(
+        driver: 'WebDriver',
+        css_selector: str,
+        logger: 'Logger',
+        max_items: int = 1200,
+        max_iterations: int = 100,
+        min_quiet: float = 0.5,
+        max_quiet: float = 5.0,
+        on_quiet: Optional[Callable[[], bool]] = None,
+        stop_below: Optional[Tuple[str, str, float]] = None
+) -> ScrollStats:
+    """
+    Scroll page while items matching css selector are appended.
+    Quiet window is three times of average time to the first appended item, clamped to min and max.
+    When quiet window passes, on_quiet is called, scrolling goes on if it returns True
+    (it may close a popup which stops loading).
+    stop_below is (css selector, attribute, limit): scrolling stops when numeric attribute
+    of the last matching element is below the limit, e.g. when older posts are loaded
+    """
+    stop_selector, stop_attribute, stop_limit = stop_below or (None, None, None)
+    start = monotonic()
+    driver.set_script_timeout(max_quiet + 10)
+    items = initial_items = driver.execute_script(START_OBSERVER_SCRIPT, css_selector)
+    quiet = max_quiet / 2
+    load_time = None
+    iterations = 0
+    stop_reason = 'max iterations'
+    try:
+        while iterations < max_iterations:
+            if items >= max_items:
+                stop_reason = 'max items'
+                break
+            iterations += 1
+            result = driver.execute_async_script(SCROLL_SCRIPT, quiet * 1000, stop_selector, stop_attribute, stop_limit)
+            items = result['total']
+            if result['stopped']:
+                stop_reason = 'stop condition'
+                break
+            if result['added']:
+                waited = result['waited'] / 1000
+                load_time = waited if load_time is None else 0.7 * load_time + 0.3 * waited
+                quiet = min(max(3 * load_time, min_quiet), max_quiet)
+                continue
+            if on_quiet and on_quiet():
+                continue
+            stop_reason = 'quiet'
+            break
+    finally:
+        driver.execute_script(STOP_OBSERVER_SCRIPT)
+
+    stats = ScrollStats(iterations, items, items - initial_items, monotonic() - start, stop_reason)
+    logger.info(
+        f'scroll is stopped by {stats.stop_reason}: {stats.iterations} iterations, {stats.items} items, '
+        f'{stats.added} appended, {stats.elapsed:.1f}s, last quiet window {quiet:.2f}s'
+    )
+    return stats
@@ -0,0 +1,122 @@
+"""
+Sharded runner of cron parsers: links are split between processes, every shard runs its own chrome.
+Runner pid is saved to the parser pid file, shards save their pids and chrome pids to {pid file}.{shard},
+so a shard restarts only its own driver and never terminates siblings
+"""
+import glob
+import multiprocessing
+import os
+import queue
+import zlib
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence
+
+from selenium_parsers.utils.parsers_signals import terminate_old_process, setup_signals_handlers, \
+    process_terminate
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+ShardTarget = Callable[[int, List[Any]], Dict[str, int]]
+
+# seconds between checks of shards liveness while stats are waited
+RESULTS_POLL_INTERVAL = 5
+
+
+def get_shard_pid_path(pid_path: str, shard_id: int) -> str:
+    return f'{pid_path}.{shard_id}'
+
+
+def split_shards(items: Sequence[Any], shards: int, key: Callable[[Any], str] = str) -> List[List[Any]]:
+    """
+    Split items by hash of key, the same link gets to the same shard on every run,
+    so its chrome profile and caches stay warm
+    """
+    buckets = [[] for _ in range(shards)]
+    for item in items:
+        buckets[zlib.crc32(key(item).encode('utf-8')) % shards].append(item)
+    return buckets
+
+
+def terminate_old_shards(pid_path: str) -> None:
+    """
+    Terminate runner and shards of the previous run, shards of this run are not started yet
+    """
+    terminate_old_process(pid_path)
+    for shard_pid_path in glob.glob(f'{glob.escape(pid_path)}.*'):
+        if shard_pid_path.rsplit('.', 1)[-1].isdigit():
+            terminate_old_process(shard_pid_path)
+
+
+def _run_shard(
+        target: ShardTarget,
+        shard_id: int,
+        items: List[Any],
+        results: multiprocessing.Queue,
+        logger: 'Logger'
+) -> None:
+    setup_signals_handlers(process_terminate)
+    logger.info(f'shard {shard_id} is started, {len(items)} items')
+    try:
+        stats = target(shard_id, items)
+    except Exception:
+        logger.error(f'shard {shard_id} failed', exc_info=True)
+        stats = {'failed_shards': 1}
+    results.put((shard_id, dict(stats)))
+
+
+def run_shards(
+        target: ShardTarget,
+        items: Sequence[Any],
+        shards: int,
+        pid_path: str,
+        logger: 'Logger',
+        key: Callable[[Any], str] = str
+) -> Counter:
+    """
+    Run target(shard_id, shard_items) in shards processes, return sum of their stats
+    """
+    terminate_old_shards(pid_path)
+    with open(pid_path, 'w') as f:
+        f.write(f'{os.getpid()}\n')
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_run_shard,
+            args=(target, shard_id, shard_items, results, logger),
+            name=f'shard-{shard_id}'
+        )
+        for shard_id, shard_items in enumerate(split_shards(items, shards, key))
+    ]
+
+    def stop_shards(sig_numb: int, frame: object) -> None:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        process_terminate(sig_numb, frame)
+
+    setup_signals_handlers(stop_shards)
+    for process in processes:
+        process.start()
+
+    stats = Counter()
+    pending = set(range(len(processes)))
+    while pending:
+        try:
+            shard_id, shard_stats = results.get(timeout=RESULTS_POLL_INTERVAL)
+        except queue.Empty:
+            dead = {shard_id for shard_id in pending if not processes[shard_id].is_alive()}
+            if dead and results.empty():
+                logger.error(f'shards {sorted(dead)} exited without stats')
+                stats['failed_shards'] += len(dead)
+                pending -= dead
+            continue
+        logger.info(f'shard {shard_id} is finished: {shard_stats}')
+        stats.update(shard_stats)
+        pending.discard(shard_id)
+
+    for process in processes:
+        process.join()
+    logger.info(f'{shards} shards are finished: {dict(stats)}')
+    return stats
@@ -0,0 +1,130 @@
+"""
+Archive of crawled pages html: snapshots are gzipped, named by sha256 of the content
+and kept with metadata of the crawl, so pages can be parsed again without browser
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Iterator, Optional, Tuple
+
+from selenium_parsers.utils.constants import SNAPSHOTS_DIR, SNAPSHOTS_MAX_AGE_DAYS, SNAPSHOTS_MAX_MB
+
+MB = 1024 * 1024
+DAY = 24 * 60 * 60
+
+SNAPSHOT_EXT = '.html.gz'
+META_EXT = '.json'
+
+
+class SnapshotArchive:
+    """
+    Snapshots of site are stored as {root}/{site}/{sha[:2]}/{sha}.html.gz
+    with {sha}.json metadata file near them
+    """
+    def __init__(
+            self,
+            root_dir: str,
+            max_age_days: int = SNAPSHOTS_MAX_AGE_DAYS,
+            max_total_mb: int = SNAPSHOTS_MAX_MB
+    ):
+        self._root_dir = root_dir
+        self._max_age = max_age_days * DAY
+        self._max_total_size = max_total_mb * MB
+
+    def _get_path(self, site: str, sha: str) -> str:
+        return os.path.join(self._root_dir, site, sha[:2], sha)
+
+    def save(self, site: str, html: str, meta: dict) -> str:
+        """
+        Save page html and crawl metadata, return snapshot sha.
+        The same content is stored once, its metadata is replaced by the last crawl
+        """
+        content = html.encode('utf-8')
+        sha = hashlib.sha256(content).hexdigest()
+        path = self._get_path(site, sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if os.path.exists(path + SNAPSHOT_EXT):
+            # snapshot is used again, retention counts age from the last crawl
+            os.utime(path + SNAPSHOT_EXT)
+        else:
+            tmp_path = f'{path}{SNAPSHOT_EXT}.tmp'
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path + SNAPSHOT_EXT)
+
+        meta = dict(meta, sha=sha, site=site, saved=time.time())
+        tmp_path = f'{path}{META_EXT}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path + META_EXT)
+        return sha
+
+    def load(self, site: str, sha: str) -> str:
+        with gzip.open(self._get_path(site, sha) + SNAPSHOT_EXT, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def iter_meta(self, site: str, since: Optional[float] = None) -> Iterator[dict]:
+        """
+        Yield metadata of site snapshots, ordered by save time
+        """
+        metas = []
+        for path, _ in self._iter_files(os.path.join(self._root_dir, site), META_EXT):
+            try:
+                with open(path, 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if since is None or meta['saved'] >= since:
+                metas.append(meta)
+        yield from sorted(metas, key=lambda item: item['saved'])
+
+    @staticmethod
+    def _iter_files(root_dir: str, ext: str) -> Iterator[Tuple[str, os.stat_result]]:
+        for root, _, files in os.walk(root_dir):
+            for file_name in files:
+                if not file_name.endswith(ext):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    yield path, os.stat(path)
+                except OSError:
+                    continue
+
+    def _remove(self, snapshot_path: str) -> None:
+        base_path = snapshot_path[:-len(SNAPSHOT_EXT)]
+        for path in (snapshot_path, base_path + META_EXT):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def enforce_retention(self) -> int:
+        """
+        Remove snapshots older than max age, then the oldest ones while archive is larger than max size,
+        return count of removed snapshots
+        """
+        snapshots = sorted(self._iter_files(self._root_dir, SNAPSHOT_EXT), key=lambda item: item[1].st_mtime)
+        expire_time = time.time() - self._max_age
+        total_size = sum(stat.st_size for _, stat in snapshots)
+        removed = 0
+        for path, stat in snapshots:
+            is_expired = self._max_age and stat.st_mtime < expire_time
+            is_over_size = self._max_total_size and total_size > self._max_total_size
+            if not (is_expired or is_over_size):
+                break
+            self._remove(path)
+            total_size -= stat.st_size
+            removed += 1
+        return removed
+
+
+def get_snapshot_archive() -> Optional[SnapshotArchive]:
+    """
+    Return archive if snapshots are enabled
+    """
+    if not SNAPSHOTS_DIR:
+        return None
+    return SnapshotArchive(SNAPSHOTS_DIR)
@@ -0,0 +1,200 @@
+"""
+Page readiness waits, they replace fixed sleeps after navigation:
+wait returns as soon as the page is ready, but not later than timeout
+"""
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
+from weakref import WeakSet
+
+from selenium.common.exceptions import WebDriverException
+
+from selenium_parsers.utils.blocking import get_traffic_meter
+from selenium_parsers.utils.cdp import get_network_events
+from selenium_parsers.utils.constants import PAGE_WAIT_TIMEOUT
+
+if TYPE_CHECKING:
+    from logging import Logger
+    from selenium.webdriver.chrome.webdriver import WebDriver
+
+Predicate = Callable[['WebDriver'], bool]
+
+POLL_INTERVAL = 0.1
+
+# drivers which already opened a page, the first page shows how warm chrome profile is
+_navigated_drivers: 'WeakSet[WebDriver]' = WeakSet()
+
+
+def document_ready(driver: 'WebDriver') -> bool:
+    """
+    Page and all its subresources are loaded
+    """
+    return driver.execute_script('return document.readyState') == 'complete'
+
+
+def element_present(css_selector: str) -> Predicate:
+    """
+    Element matching css selector is in DOM, check doesn't use driver implicit wait
+    """
+    def predicate(driver: 'WebDriver') -> bool:
+        return driver.execute_script('return document.querySelector(arguments[0]) !== null', css_selector)
+    predicate.__name__ = f'element_present({css_selector!r})'
+    return predicate
+
+
+def element_absent(css_selector: str) -> Predicate:
+    """
+    There is no element matching css selector in DOM
+    """
+    def predicate(driver: 'WebDriver') -> bool:
+        return driver.execute_script('return document.querySelector(arguments[0]) === null', css_selector)
+    predicate.__name__ = f'element_absent({css_selector!r})'
+    return predicate
+
+
+def xpath_present(xpath: str) -> Predicate:
+    """
+    Node matching xpath is in DOM
+    """
+    def predicate(driver: 'WebDriver') -> bool:
+        return driver.execute_script(
+            'return document.evaluate(arguments[0], document, null, '
+            'XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null',
+            xpath
+        )
+    predicate.__name__ = f'xpath_present({xpath!r})'
+    return predicate
+
+
+class NetworkIdle:
+    """
+    Network is idle when no more than max_pending requests are running during quiet period,
+    requests are tracked by devtools network events from chrome performance log
+    """
+    __name__ = 'network_idle'
+
+    def __init__(self, quiet_period: float = 0.5, max_pending: int = 0):
+        self._quiet_period = quiet_period
+        self._max_pending = max_pending
+        self._pending = set()
+        self._last_activity = monotonic()
+
+    def __call__(self, driver: 'WebDriver') -> bool:
+        now = monotonic()
+        for method, params in get_network_events(driver):
+            request_id = params.get('requestId')
+            if method == 'Network.requestWillBeSent':
+                self._pending.add(request_id)
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                self._pending.discard(request_id)
+            else:
+                continue
+            self._last_activity = now
+        if len(self._pending) > self._max_pending:
+            self._last_activity = now
+            return False
+        return now - self._last_activity >= self._quiet_period
+
+
+class ReadinessProfile:
+    """
+    Readiness conditions of site pages
+    """
+    def __init__(
+            self,
+            selectors: Iterable[str] = (),
+            network_idle: bool = False,
+            max_pending_requests: int = 0,
+            timeout: float = PAGE_WAIT_TIMEOUT
+    ):
+        self.selectors = tuple(selectors)
+        self.network_idle = network_idle
+        self.max_pending_requests = max_pending_requests
+        self.timeout = timeout
+
+    def predicates(self) -> List[Predicate]:
+        predicates = [document_ready]
+        predicates.extend(element_present(selector) for selector in self.selectors)
+        if self.network_idle:
+            predicates.append(NetworkIdle(max_pending=self.max_pending_requests))
+        return predicates
+
+
+# facebook and tiktok keep several long polling connections open all the time
+SITE_PROFILES = {
+    'default': ReadinessProfile(),
+    'facebook': ReadinessProfile(selectors=('#contentArea',), network_idle=True, max_pending_requests=2),
+    'facebook_login': ReadinessProfile(selectors=('input[name="email"]',)),
+    'instagram': ReadinessProfile(selectors=('article',)),
+    # views block exists on video posts only, other posts would wait for it until timeout
+    'odnoklassniki': ReadinessProfile(network_idle=True, max_pending_requests=2),
+    'tiktok': ReadinessProfile(selectors=('.video-feed-item',), network_idle=True, max_pending_requests=2),
+}
+
+
+def _is_ready(driver: 'WebDriver', predicate: Predicate) -> bool:
+    try:
+        return bool(predicate(driver))
+    except WebDriverException:
+        # document could be replaced while script is running
+        return False
+
+
+def wait_until_ready(
+        driver: 'WebDriver',
+        predicates: List[Predicate],
+        logger: 'Logger',
+        description: str,
+        timeout: float = PAGE_WAIT_TIMEOUT
+) -> float:
+    """
+    Wait until all predicates are true or timeout is reached, return waiting time.
+    Timeout is not an error: page is parsed as is, like after fixed sleep
+    """
+    start = monotonic()
+    pending = list(predicates)
+    while True:
+        pending = [predicate for predicate in pending if not _is_ready(driver, predicate)]
+        elapsed = monotonic() - start
+        if not pending:
+            logger.info(f'{description} is ready in {elapsed:.2f}s')
+            return elapsed
+        if elapsed >= timeout:
+            not_ready = ', '.join(getattr(predicate, '__name__', repr(predicate)) for predicate in pending)
+            logger.warning(f'{description} is not ready in {elapsed:.2f}s, waiting for: {not_ready}')
+            return elapsed
+        sleep(POLL_INTERVAL)
+
+
+def wait_for_site(driver: 'WebDriver', site: str, logger: 'Logger', description: Optional[str] = None) -> float:
+    """
+    Wait until page of site is ready
+    """
+    profile = SITE_PROFILES[site]
+    return wait_until_ready(
+        driver,
+        profile.predicates(),
+        logger,
+        description or f'{site} page {driver.current_url}',
+        timeout=profile.timeout
+    )
+
+
+def open_page(driver: 'WebDriver', url: str, site: str, logger: 'Logger') -> float:
+    """
+    Navigate to url and wait until page is ready, return waiting time after navigation
+    """
+    # drop network events of the previous page
+    get_network_events(driver)
+    meter = get_traffic_meter(driver)
+    if meter:
+        meter.reset()
+    start = monotonic()
+    driver.get(url)
+    elapsed = wait_for_site(driver, site, logger, f'{site} page {url}')
+    if driver not in _navigated_drivers:
+        _navigated_drivers.add(driver)
+        logger.info(f'first page {url} is loaded in {monotonic() - start:.2f}s')
+    if meter:
+        get_network_events(driver)
+        logger.info(f'{site} page {url} traffic: {meter.get_report()}')
+    return elapsed
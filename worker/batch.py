@@ -0,0 +1,41 @@
+import datetime
+import threading
+from typing import Callable, Dict, List
+
+
+class BatchTask:
+    """
+    Compare task with many links, links are parsed by all consumers of the worker,
+    task is complete when results of all its links are saved
+    """
+    def __init__(self, task_hash: str, links: List[str], on_complete: Callable[['BatchTask'], None]):
+        self.task_hash = task_hash
+        self.links = links
+        self._on_complete = on_complete
+        # link index -> compare data, the same link can be passed several times
+        self._results: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def add_result(self, index: int, result: dict) -> None:
+        with self._lock:
+            self._results[index] = result
+            is_complete = len(self._results) == len(self.links)
+        if is_complete:
+            self._on_complete(self)
+
+    def get_summary(self) -> dict:
+        """
+        Return summary document of the task
+        """
+        with self._lock:
+            results = [self._results[i] for i in range(len(self.links))]
+        failed = sum(1 for result in results if 'error' in result)
+        return {
+            'task_hash': self.task_hash,
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'results': results,
+            'finished': True,
+            'datetime': datetime.datetime.now(),
+        }
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+# host prefixes of the same resource: localized and mobile versions
+HOST_PREFIXES = ('www.', 'ru-ru.', 'm.', 'mobile.')
+# query params which does not change the resource
+IGNORED_QUERY_PARAMS = ('igshid', 'ref', 'fref', 'hc_ref', '__tn__', '__xts__')
+
+
+def normalize_link(link: str) -> str:
+    """
+    Return link of post without localization, tracking params and trailing slash
+    """
+    parsed_uri = urlparse(link.strip())
+    host = (parsed_uri.hostname or '').lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed_uri.query)
+        if key not in IGNORED_QUERY_PARAMS and not key.startswith('utm_')
+    )
+    return urlunparse(('https', host, parsed_uri.path.rstrip('/'), '', urlencode(query), ''))
+
+
+class _Fetch:
+    """
+    Result of the fetch, which is running now
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[Exception] = None
+
+
+class CompareCache:
+    """
+    Keep compare results of recently parsed links for ttl seconds,
+    requests for the link which is being fetched wait for that fetch instead of starting a new one
+    """
+    def __init__(self, ttl: float, max_size: int):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # link -> (expiration time, value), ordered by expiration time since ttl is the same for all links
+        self._results: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._in_flight = {}
+
+    def _evict(self, now: float) -> None:
+        while self._results:
+            link, (expires, _) = next(iter(self._results.items()))
+            if expires > now and len(self._results) <= self._max_size:
+                break
+            del self._results[link]
+
+    def _store(self, link: str, value: Any) -> None:
+        if self._ttl <= 0:
+            return
+        now = monotonic()
+        with self._lock:
+            self._results.pop(link, None)
+            self._results[link] = (now + self._ttl, value)
+            self._evict(now)
+
+    def get(self, link: str) -> Optional[Any]:
+        """
+        Return cached value of link or None
+        """
+        key = normalize_link(link)
+        with self._lock:
+            self._evict(monotonic())
+            entry = self._results.get(key)
+        return entry[1] if entry else None
+
+    def get_or_fetch(self, link: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Return cached value of link or call fetch
+        """
+        key = normalize_link(link)
+        with self._lock:
+            self._evict(monotonic())
+            if key in self._results:
+                return self._results[key][1]
+            in_flight = self._in_flight.get(key)
+            is_owner = in_flight is None
+            if is_owner:
+                in_flight = self._in_flight[key] = _Fetch()
+
+        if not is_owner:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.value
+
+        try:
+            in_flight.value = fetch()
+        except Exception as e:
+            in_flight.error = e
+            raise
+        else:
+            self._store(key, in_flight.value)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+        return in_flight.value
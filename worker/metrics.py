@@ -0,0 +1,218 @@
+"""
+Worker metrics in prometheus text format
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger('selenium_worker')
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40)
+
+
+def _labels_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric:
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.metric_type}',
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """
+    Gauge value is set directly or is calculated by callback on every scrape
+    """
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+        self._callbacks: Dict[Labels, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_labels_key(labels)] = value
+
+    def set_function(self, callback: Callable[[], float], **labels) -> None:
+        with self._lock:
+            self._callbacks[_labels_key(labels)] = callback
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            values = dict(self._values)
+            callbacks = dict(self._callbacks)
+        for labels, callback in callbacks.items():
+            try:
+                values[labels] = callback()
+            except Exception:
+                logger.warning(f'can not calculate metric {self.name}', exc_info=True)
+        return [(self.name, labels, value) for labels, value in values.items()]
+
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self._buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # labels -> (bucket counters, sum)
+        self._values: Dict[Labels, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self._buckets), 0.0)
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observe duration of the block
+        """
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.observe(monotonic() - start, **labels)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        samples = []
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self._buckets, counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', labels + (('le', _format_value(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', labels, total))
+            samples.append((f'{self.name}_count', labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+MESSAGES_CONSUMED = REGISTRY.register(Counter(
+    'selenium_worker_messages_consumed_total', 'Messages received from the input queue'
+))
+LINKS_PROCESSED = REGISTRY.register(Counter(
+    'selenium_worker_links_processed_total', 'Processed links by domain and status'
+))
+NAVIGATION_SECONDS = REGISTRY.register(Histogram(
+    'selenium_worker_navigation_seconds', 'Time of page loading including readiness wait'
+))
+EXTRACTION_SECONDS = REGISTRY.register(Histogram(
+    'selenium_worker_extraction_seconds', 'Time of post data extraction from loaded page'
+))
+SAVE_SECONDS = REGISTRY.register(Histogram(
+    'selenium_worker_save_seconds', 'Time of results batch writing to mongo'
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'selenium_worker_queue_depth', 'Messages waiting in rabbitmq queue'
+))
+SCHEDULED_JOBS = REGISTRY.register(Gauge(
+    'selenium_worker_scheduled_jobs', 'Links received by the worker and waiting for a browser'
+))
+CHROME_RSS_BYTES = REGISTRY.register(Gauge(
+    'selenium_worker_chrome_rss_bytes', 'Resident memory of consumer chrome process tree'
+))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scrapes are too frequent for the worker log
+        pass
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """
+    Serve /metrics in a background thread
+    """
+    server = ThreadingHTTPServer(('', port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    logger.info(f'metrics are available on port {port}')
+    return server
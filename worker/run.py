@@ -1,39 +1,83 @@
 import json
 import logging
 import os
-from time import sleep
-from typing import TYPE_CHECKING
+import threading
+from functools import partial
+from time import monotonic
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple
 from urllib.parse import urlparse
 
 import pika
-from selenium.common.exceptions import NoSuchElementException
+import pika.exceptions
+from pymongo.errors import PyMongoError
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
 
 from selenium_parsers.facebook.groups_parser import parse_post
 from selenium_parsers.facebook.utils.page import transform_link_to_russian
-from selenium_parsers.utils.constants import SELENIUM_WORKER_PID_PATH, RABBIT_HOST
+from selenium_parsers.facebook.utils.post import extract_posts_data
+from selenium_parsers.utils.constants import (
+    SELENIUM_WORKER_PID_PATH, RABBIT_HOST, SELENIUM_WORKER_CONSUMERS, SELENIUM_WORKER_DEBUGGING_PORT,
+    SELENIUM_WORKER_MAX_RETRIES, SELENIUM_WORKER_RETRY_DELAY, SELENIUM_WORKER_PREFETCH,
+    SELENIUM_WORKER_RESULTS_BATCH_SIZE, SELENIUM_WORKER_RESULTS_FLUSH_INTERVAL, SELENIUM_WORKER_CACHE_TTL,
+    SELENIUM_WORKER_CACHE_SIZE, SELENIUM_WORKER_DOMAIN_RATE, SELENIUM_WORKER_DOMAIN_BURST,
+    SELENIUM_WORKER_DOMAIN_RATES, SELENIUM_WORKER_METRICS_PORT
+)
+from selenium_parsers.utils.parsers_signals import setup_signals_handlers
+from selenium_parsers.utils.recycling import DriverRecycler, MB
 from selenium_parsers.utils.selenium_loggers import setup_logger
+from selenium_parsers.utils.waits import open_page
 from selenium_parsers.worker.utils import (
-    get_driver, save_result, create_vhost_if_not_exist, cast_facebook_compare_data, cast_instagram_compare_data
+    get_driver, create_vhost_if_not_exist, cast_facebook_compare_data, cast_instagram_compare_data,
+    get_consumer_pid_path, get_result_document, get_results_collection, fetch_instagram_post_page,
+    start_batch_summary, save_batch_summary
+)
+from selenium_parsers.worker.batch import BatchTask
+from selenium_parsers.worker.cache import CompareCache
+from selenium_parsers.worker.metrics import (
+    start_metrics_server, MESSAGES_CONSUMED, LINKS_PROCESSED, NAVIGATION_SECONDS, EXTRACTION_SECONDS, QUEUE_DEPTH,
+    SCHEDULED_JOBS, CHROME_RSS_BYTES
 )
+from selenium_parsers.worker.scheduler import DomainScheduler
+from selenium_parsers.worker.writer import ResultsWriter
 
 if TYPE_CHECKING:
+    from pika.adapters.blocking_connection import BlockingChannel
+    from pika.spec import Basic
     from selenium.webdriver.chrome.webdriver import WebDriver
 
 logger = logging.getLogger('selenium_worker')
 
 VHOST_NAME = 'selenium_worker_posts'
 QUEUE_IN = 'selenium_worker_posts_in'
+# messages which failed more than SELENIUM_WORKER_MAX_RETRIES times
+QUEUE_DEAD = 'selenium_worker_posts_dead'
+RETRIES_HEADER = 'x-retries'
+# seconds between reconnection attempts to rabbitmq
+RECONNECT_DELAY = 5
+# max seconds consumer waits for a job before it checks its connection again
+SCHEDULER_POLL_INTERVAL = 0.2
+# seconds between input queue depth requests
+QUEUE_DEPTH_INTERVAL = 5
 
 
 def parse_fb_post(driver: 'WebDriver', post_link: str) -> dict:
-    club_id = post_link.split('/')[-1]
-    post_el = driver.find_element_by_css_selector('#contentArea')
-    fb_obj = parse_post(post_el, club_id)
+    with NAVIGATION_SECONDS.time(domain='facebook.com'):
+        open_page(driver, post_link, 'facebook', logger)
+    with EXTRACTION_SECONDS.time(domain='facebook.com'):
+        club_id = post_link.split('/')[-1]
+        post_el = driver.find_element_by_css_selector('#contentArea')
+        fb_obj = parse_post(extract_posts_data(driver, [post_el])[0], club_id)
     return cast_facebook_compare_data(post_link, fb_obj, 'facebook.com')
 
 
 def parse_insta_post(driver: 'WebDriver', post_link: str) -> dict:
-    post_page = driver.execute_script("return window._sharedData.entry_data.PostPage[0]")
+    with NAVIGATION_SECONDS.time(domain='instagram.com', source='http'):
+        post_page = fetch_instagram_post_page(post_link)
+    if post_page is None:
+        logger.info(f'instagram post data was not found in html, use browser: {post_link}')
+        with NAVIGATION_SECONDS.time(domain='instagram.com', source='browser'):
+            open_page(driver, post_link, 'instagram', logger)
+        post_page = driver.execute_script("return window._sharedData.entry_data.PostPage[0]")
     if post_page is None:
         logger.error(f'can not parse post - : {post_link.encode("utf-8")}')
         raise NoSuchElementException("Unavailable Page: {}".format(post_link.encode("utf-8")))
@@ -61,52 +105,389 @@ def get_second_level_domain(link: str) -> str:
     return '.'.join(domain.split('.')[-2:])
 
 
-def callback(ch, method, properties, body):
+def parse_message(body: bytes) -> Tuple[str, List[str], bool]:
+    """
+    Return task hash, post links and batch flag from queue message,
+    single message contains post_link, batch message contains post_links list
+    """
     body_json = json.loads(body)
-    post_link = body_json['post_link']
-    task_hash = body_json['task_hash']
-    driver = get_driver('selenium worker', pid_path=SELENIUM_WORKER_PID_PATH)
+    if 'post_links' in body_json:
+        post_links = body_json['post_links']
+        if not isinstance(post_links, list):
+            raise ValueError(f'post_links should be a list, got {type(post_links)}')
+        return body_json['task_hash'], post_links, True
+    return body_json['task_hash'], [body_json['post_link']], False
 
-    post_link = handle_link(post_link)
-    driver.get(post_link)
-    sleep(2)
 
+def get_compare_result(driver: 'WebDriver', post_link: str) -> Tuple[str, dict]:
+    """
+    Parse post, return parsed link and compare data
+    """
+    post_link = handle_link(post_link)
     services_map = {
         'facebook.com': parse_fb_post,
         'instagram.com': parse_insta_post,
     }
     domain = get_second_level_domain(post_link)
-    if domain in services_map:
-        post_data = services_map[domain](driver, post_link)
-        save_result(task_hash, post_link, post_data)
-    else:
-        save_result(
-            task_hash,
-            post_link,
-            {'error': f'Для публикаций на домене {domain} подсчет не реализован'}
+    if domain not in services_map:
+        return post_link, {'error': f'Для публикаций на домене {domain} подсчет не реализован'}
+    return post_link, services_map[domain](driver, post_link)
+
+
+def get_retry_delay(attempt: int) -> int:
+    """
+    Return redelivery delay in seconds, delay grows exponentially with attempts
+    """
+    return SELENIUM_WORKER_RETRY_DELAY * 2 ** (attempt - 1)
+
+
+def get_retry_queue(attempt: int) -> str:
+    """
+    Return name of the delay queue, which returns expired messages back to the input queue
+    """
+    return f'selenium_worker_posts_retry_{get_retry_delay(attempt)}s'
+
+
+def declare_queues(channel) -> None:
+    """
+    Declare input, delay and dead letter queues
+    """
+    channel.queue_declare(queue=QUEUE_IN)
+    channel.queue_declare(queue=QUEUE_DEAD, durable=True)
+    for attempt in range(1, SELENIUM_WORKER_MAX_RETRIES + 1):
+        channel.queue_declare(
+            queue=get_retry_queue(attempt),
+            arguments={
+                'x-message-ttl': get_retry_delay(attempt) * 1000,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': QUEUE_IN,
+            }
+        )
+
+
+class Delivery(NamedTuple):
+    """
+    Message received by one of consumers, channel operations with it are allowed
+    only in the thread of that consumer connection
+    """
+    channel: 'BlockingChannel'
+    method: 'Basic.Deliver'
+    properties: 'pika.BasicProperties'
+    body: bytes
+    task_hash: str
+
+
+class LinkJob(NamedTuple):
+    """
+    Link of the message, batch message produces a job per link
+    """
+    delivery: Delivery
+    post_link: str
+    domain: str
+    batch: Optional[BatchTask] = None
+    index: int = 0
+    attempt: int = 0
+
+
+class Consumer(threading.Thread):
+    """
+    Queue consumer with its own rabbitmq connection and chrome.
+    Received messages are put to the scheduler shared by consumers of the worker process,
+    consumer processes the job which scheduler returns, it can be received by any consumer
+    """
+    def __init__(
+            self,
+            consumer_id: int,
+            stop_event: threading.Event,
+            writer: ResultsWriter,
+            cache: CompareCache,
+            scheduler: DomainScheduler
+    ):
+        super().__init__(name=f'selenium-worker-{consumer_id}', daemon=True)
+        self.consumer_id = consumer_id
+        self._stop_event = stop_event
+        self._writer = writer
+        self._cache = cache
+        self._scheduler = scheduler
+        self._recycler = DriverRecycler(
+            partial(
+                get_driver,
+                f'selenium worker {consumer_id}',
+                pid_path=get_consumer_pid_path(SELENIUM_WORKER_PID_PATH, consumer_id),
+                debugging_port=SELENIUM_WORKER_DEBUGGING_PORT + consumer_id
+            ),
+            logger
+        )
+        CHROME_RSS_BYTES.set_function(lambda: self._recycler.get_rss_mb() * MB, consumer=consumer_id)
+
+    @property
+    def driver(self) -> 'WebDriver':
+        return self._recycler.driver
+
+    def _ack(self, ch, delivery_tag: int) -> None:
+        if ch.is_open:
+            ch.basic_ack(delivery_tag=delivery_tag)
+        else:
+            logger.warning(f'consumer {self.consumer_id} can not ack message, it will be redelivered')
+
+    def _reject(self, ch, method, properties, body: bytes, error: Exception, retry: bool = True) -> None:
+        """
+        Send failed message to the delay queue or to the dead letter queue,
+        when it is out of attempts
+        """
+        if not ch.is_open:
+            logger.warning(f'consumer {self.consumer_id} can not reject message, it will be redelivered')
+            return
+        headers = dict(properties.headers or {})
+        attempt = headers.get(RETRIES_HEADER, 0) + 1
+        headers[RETRIES_HEADER] = attempt
+        if retry and attempt <= SELENIUM_WORKER_MAX_RETRIES:
+            queue = get_retry_queue(attempt)
+            logger.warning(f'message will be redelivered in {get_retry_delay(attempt)}s, attempt {attempt}')
+        else:
+            queue = QUEUE_DEAD
+            headers['x-error'] = repr(error)
+            logger.error(f'message was moved to {QUEUE_DEAD}: {body}')
+        ch.basic_publish(
+            exchange='',
+            routing_key=queue,
+            body=body,
+            # keep publisher properties except expiration, delay is set by retry queue ttl,
+            # dead letter queue is durable and its messages are persistent
+            properties=pika.BasicProperties(
+                content_type=properties.content_type,
+                content_encoding=properties.content_encoding,
+                headers=headers,
+                delivery_mode=2 if queue == QUEUE_DEAD else properties.delivery_mode,
+                priority=properties.priority,
+                correlation_id=properties.correlation_id,
+                reply_to=properties.reply_to,
+                message_id=properties.message_id,
+                timestamp=properties.timestamp,
+                type=properties.type,
+                app_id=properties.app_id
+            )
         )
+        ch.basic_ack(delivery_tag=method.delivery_tag)
 
+    def _call_threadsafe(self, ch, callback) -> None:
+        """
+        Schedule channel operation to the thread of channel connection
+        """
+        try:
+            ch.connection.add_callback_threadsafe(callback)
+        except pika.exceptions.AMQPError:
+            logger.warning(f'consumer {self.consumer_id} connection is closed, message will be redelivered')
 
-def main():
-    with pika.BlockingConnection(
-        pika.ConnectionParameters(
-            host=RABBIT_HOST,
-            virtual_host=VHOST_NAME
+    def _reject_threadsafe(self, delivery: Delivery, error: Exception) -> None:
+        self._call_threadsafe(
+            delivery.channel,
+            partial(self._reject, delivery.channel, delivery.method, delivery.properties, delivery.body, error)
         )
-    ) as conn:
-        channel = conn.channel()
-        channel.queue_declare(queue=QUEUE_IN)
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(
-            queue=QUEUE_IN,
-            on_message_callback=callback,
-            auto_ack=True
+
+    def _ack_threadsafe(self, delivery: Delivery) -> None:
+        self._call_threadsafe(delivery.channel, partial(self._ack, delivery.channel, delivery.method.delivery_tag))
+
+    def _save(self, job: LinkJob, post_link: str, post_data: dict) -> None:
+        """
+        Write result, single message is acked only after its result was written
+        """
+        document = get_result_document(job.delivery.task_hash, post_link, post_data)
+        if job.batch is None:
+            self._writer.write(
+                document,
+                on_saved=partial(self._ack_threadsafe, job.delivery),
+                on_failed=partial(self._reject_threadsafe, job.delivery, RuntimeError('result was not saved'))
+            )
+        else:
+            self._writer.write(
+                document,
+                on_saved=partial(job.batch.add_result, job.index, post_data),
+                on_failed=partial(job.batch.add_result, job.index, {'error': 'Результат не был сохранен'})
+            )
+
+    def _complete_batch(self, delivery: Delivery, batch: BatchTask) -> None:
+        """
+        Save batch summary and ack batch message
+        """
+        summary = batch.get_summary()
+        try:
+            save_batch_summary(summary)
+        except PyMongoError as e:
+            logger.error(f'can not save summary of batch {batch.task_hash}', exc_info=True)
+            self._reject_threadsafe(delivery, e)
+            return
+        logger.info(
+            f'batch {batch.task_hash} is finished: {summary["succeeded"]} of {summary["total"]} links were parsed'
         )
+        self._ack_threadsafe(delivery)
+
+    def _schedule(self, job: LinkJob) -> None:
+        cached = self._cache.get(job.post_link)
+        if cached is not None:
+            LINKS_PROCESSED.inc(domain=job.domain, status='cached')
+            self._save(job, *cached)
+        else:
+            self._scheduler.put(job.domain, job)
+
+    def on_message(self, ch, method, properties, body):
+        MESSAGES_CONSUMED.inc()
+        try:
+            task_hash, post_links, is_batch = parse_message(body)
+            domains = [get_second_level_domain(handle_link(post_link)) for post_link in post_links]
+        except (ValueError, KeyError, AttributeError, TypeError) as e:
+            logger.error(f'consumer {self.consumer_id} got malformed message', exc_info=True)
+            self._reject(ch, method, properties, body, e, retry=False)
+            return
+
+        delivery = Delivery(ch, method, properties, body, task_hash)
+        if not is_batch:
+            self._schedule(LinkJob(delivery, post_links[0], domains[0]))
+            return
+
+        logger.info(f'consumer {self.consumer_id} got batch {task_hash} of {len(post_links)} links')
+        batch = BatchTask(task_hash, post_links, on_complete=partial(self._complete_batch, delivery))
+        try:
+            start_batch_summary(task_hash, len(post_links))
+        except PyMongoError as e:
+            logger.error(f'can not start batch {task_hash}', exc_info=True)
+            self._reject(ch, method, properties, body, e)
+            return
+        if not post_links:
+            self._complete_batch(delivery, batch)
+        for index, (post_link, domain) in enumerate(zip(post_links, domains)):
+            self._schedule(LinkJob(delivery, post_link, domain, batch=batch, index=index))
+
+    def _on_batch_link_failed(self, job: LinkJob, error: Exception) -> None:
+        """
+        Retry batch link in this worker with growing delay, save error result when it is out of attempts
+        """
+        attempt = job.attempt + 1
+        if attempt <= SELENIUM_WORKER_MAX_RETRIES:
+            logger.warning(f'batch link {job.post_link} will be retried in {get_retry_delay(attempt)}s')
+            timer = threading.Timer(
+                get_retry_delay(attempt),
+                self._scheduler.put,
+                args=(job.domain, job._replace(attempt=attempt))
+            )
+            timer.daemon = True
+            timer.start()
+        else:
+            self._save(job, handle_link(job.post_link), {'error': f'Не удалось получить данные публикации: {error!r}'})
 
-        channel.start_consuming()
-        logger.info('Worker is online')
-        while True:
-            pass
+    def process(self, job: LinkJob) -> None:
+        if not job.delivery.channel.is_open:
+            # message was returned to the queue with the closed connection
+            return
+
+        try:
+            post_link, post_data = self._cache.get_or_fetch(
+                job.post_link,
+                lambda: get_compare_result(self.driver, job.post_link)
+            )
+        except Exception as e:
+            LINKS_PROCESSED.inc(domain=job.domain, status='failure')
+            logger.error(f'consumer {self.consumer_id} can not process link {job.post_link}', exc_info=True)
+            if isinstance(e, WebDriverException):
+                # chrome could crash, next message will start a new one
+                self._recycler.quit()
+            if job.batch is None:
+                self._reject_threadsafe(job.delivery, e)
+            else:
+                self._on_batch_link_failed(job, e)
+            return
+        LINKS_PROCESSED.inc(domain=job.domain, status='success')
+        self._save(job, post_link, post_data)
+
+    def _consume(self) -> None:
+        """
+        Consume messages until stop event, unacked messages return to the queue on exit
+        """
+        with pika.BlockingConnection(
+            pika.ConnectionParameters(
+                host=RABBIT_HOST,
+                virtual_host=VHOST_NAME
+            )
+        ) as conn:
+            channel = conn.channel()
+            declare_queues(channel)
+            channel.basic_qos(prefetch_count=SELENIUM_WORKER_PREFETCH)
+            channel.basic_consume(
+                queue=QUEUE_IN,
+                on_message_callback=self.on_message
+            )
+            queue_depth_updated = 0
+            while not self._stop_event.is_set():
+                conn.process_data_events(time_limit=0)
+                if self.consumer_id == 0 and monotonic() - queue_depth_updated > QUEUE_DEPTH_INTERVAL:
+                    queue_state = channel.queue_declare(queue=QUEUE_IN, passive=True)
+                    QUEUE_DEPTH.set(queue_state.method.message_count, queue=QUEUE_IN)
+                    queue_depth_updated = monotonic()
+                job = self._scheduler.get(timeout=SCHEDULER_POLL_INTERVAL)
+                if job is not None:
+                    self.process(job)
+                    self._recycler.page_done()
+            channel.cancel()
+            # write pending results and send their acks before the connection is closed
+            self._writer.flush()
+            conn.process_data_events(time_limit=0)
+
+    def run(self):
+        try:
+            # start chrome before the first message arrives
+            logger.info(f'consumer {self.consumer_id} use chrome session {self.driver.session_id}')
+            while not self._stop_event.is_set():
+                try:
+                    self._consume()
+                except pika.exceptions.AMQPConnectionError:
+                    logger.error(f'consumer {self.consumer_id} lost rabbitmq connection', exc_info=True)
+                    self._stop_event.wait(RECONNECT_DELAY)
+        except Exception:
+            logger.critical(f'consumer {self.consumer_id} was stopped', exc_info=True)
+            raise
+        finally:
+            self._recycler.quit()
+        logger.info(f'consumer {self.consumer_id} is stopped')
+
+
+def main(consumers_count: int) -> None:
+    stop_event = threading.Event()
+    if SELENIUM_WORKER_METRICS_PORT:
+        start_metrics_server(SELENIUM_WORKER_METRICS_PORT)
+
+    def stop_consumers(sig_numb: int, frame: object) -> None:
+        logger.info(f'Received signal: {sig_numb}, stop consumers')
+        stop_event.set()
+
+    setup_signals_handlers(stop_consumers)
+    writer = ResultsWriter(
+        get_results_collection(),
+        batch_size=SELENIUM_WORKER_RESULTS_BATCH_SIZE,
+        flush_interval=SELENIUM_WORKER_RESULTS_FLUSH_INTERVAL
+    )
+    writer.start()
+    cache = CompareCache(ttl=SELENIUM_WORKER_CACHE_TTL, max_size=SELENIUM_WORKER_CACHE_SIZE)
+    scheduler = DomainScheduler(
+        default_rate=SELENIUM_WORKER_DOMAIN_RATE,
+        burst=SELENIUM_WORKER_DOMAIN_BURST,
+        rates=SELENIUM_WORKER_DOMAIN_RATES
+    )
+    SCHEDULED_JOBS.set_function(lambda: len(scheduler))
+    logger.info(
+        f'domain rate limits: {SELENIUM_WORKER_DOMAIN_RATES}, default: {SELENIUM_WORKER_DOMAIN_RATE} per second, '
+        f'burst: {SELENIUM_WORKER_DOMAIN_BURST}'
+    )
+    consumers = [
+        Consumer(consumer_id, stop_event, writer, cache, scheduler)
+        for consumer_id in range(consumers_count)
+    ]
+    for consumer in consumers:
+        consumer.start()
+    logger.info(f'Worker is online, consumers: {consumers_count}')
+    for consumer in consumers:
+        consumer.join()
+    writer.close()
+    logger.info('Worker is offline')
 
 
 if __name__ == '__main__':
@@ -116,4 +497,4 @@ if __name__ == '__main__':
         logger_name='selenium_worker'
     )
     create_vhost_if_not_exist()
-    main()
+    main(SELENIUM_WORKER_CONSUMERS)
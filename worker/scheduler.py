@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict, deque
+from time import monotonic
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """
+    Allow rate requests per second on average and up to burst requests at once,
+    zero or negative rate means no limit
+    """
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._capacity = max(burst, 1)
+        self._tokens = float(self._capacity)
+        self._updated = monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def delay(self, now: float) -> float:
+        """
+        Return seconds until the next token is available
+        """
+        if self._rate <= 0:
+            return 0
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self._rate
+
+    def consume(self, now: float) -> None:
+        if self._rate <= 0:
+            return
+        self._refill(now)
+        self._tokens -= 1
+
+
+class DomainScheduler:
+    """
+    Fair scheduler of worker jobs: jobs are queued per domain
+    and taken round robin among domains whose rate limit allows one more request
+    """
+    def __init__(self, default_rate: float, burst: int, rates: Optional[Dict[str, float]] = None):
+        self._default_rate = default_rate
+        self._burst = burst
+        self._rates = rates or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        # domain -> jobs, domain order is the round robin order
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+        self._condition = threading.Condition()
+
+    def _get_bucket(self, domain: str) -> TokenBucket:
+        if domain not in self._buckets:
+            self._buckets[domain] = TokenBucket(self._rates.get(domain, self._default_rate), self._burst)
+        return self._buckets[domain]
+
+    def put(self, domain: str, job: Any) -> None:
+        with self._condition:
+            self._queues.setdefault(domain, deque()).append(job)
+            self._condition.notify()
+
+    def get(self, timeout: float) -> Optional[Any]:
+        """
+        Return next job or None if there is no job, which is allowed to run during timeout
+        """
+        deadline = monotonic() + timeout
+        with self._condition:
+            while True:
+                now = monotonic()
+                wait = deadline - now
+                for domain, jobs in self._queues.items():
+                    bucket = self._get_bucket(domain)
+                    delay = bucket.delay(now)
+                    if delay > 0:
+                        wait = min(wait, delay)
+                        continue
+                    bucket.consume(now)
+                    job = jobs.popleft()
+                    if jobs:
+                        self._queues.move_to_end(domain)
+                    else:
+                        del self._queues[domain]
+                    return job
+                if wait <= 0:
+                    return None
+                self._condition.wait(wait)
+
+    def __len__(self) -> int:
+        with self._condition:
+            return sum(len(jobs) for jobs in self._queues.values())
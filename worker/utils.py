@@ -1,17 +1,24 @@
 import datetime
+import json
 import logging
-from typing import TYPE_CHECKING
+import re
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
 import pymongo
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 from selenium_parsers.utils.constants import USE_PROXY, SELENIUM_WORKER_PROXY_IP, SELENIUM_WORKER_PROXY_PORT, \
-    HEADLESS_SELENIUM_PARSERS, RABBIT_HOST
-from selenium_parsers.utils.general import webdriver_singleton, get_tuned_driver
+    HEADLESS_SELENIUM_PARSERS, RABBIT_HOST, SELENIUM_WORKER_HTTP_TIMEOUT, USER_AGENT
+from selenium_parsers.utils.general import get_tuned_driver
 from selenium_parsers.utils.mongo_models import FacebookPostData
+from selenium_parsers.utils.parsers_signals import terminate_old_process, save_driver_pid
 
 if TYPE_CHECKING:
+    from pymongo.collection import Collection
     from selenium.webdriver.chrome.webdriver import WebDriver
 
 
@@ -20,21 +27,83 @@ logger = logging.getLogger('selenium_worker')
 # rabbitmq virtual host
 VHOST_NAME = 'selenium_worker_posts'
 
+INSTAGRAM_SHARED_DATA_RE = re.compile(r'window\._sharedData\s*=\s*(\{.+?\});?\s*</script>', re.DOTALL)
 
-@webdriver_singleton
-def get_driver(server_name: str, pid_path: str) -> 'WebDriver':
+_http_local = threading.local()
+
+
+def get_driver(server_name: str, pid_path: str, debugging_port: int) -> 'WebDriver':
+    """
+    Start chrome for one worker consumer, every consumer has its own pid file and debugging port
+    """
     extra_params = {}
     if USE_PROXY:
         extra_params.update(
             proxy_ip=SELENIUM_WORKER_PROXY_IP,
             proxy_port=SELENIUM_WORKER_PROXY_PORT
         )
-    return get_tuned_driver(
+    terminate_old_process(pid_path)
+    driver = get_tuned_driver(
         parser_name=server_name,
         logger=logger,
         headless=HEADLESS_SELENIUM_PARSERS,
+        debugging_port=debugging_port,
+        blocking_profile='worker',
         **extra_params
     )
+    # consumers are threads of one worker process, pid file of consumer holds its chrome processes only,
+    # so chrome restart after a crash does not terminate the worker
+    save_driver_pid(driver, pid_path, with_script_pid=False)
+    return driver
+
+
+def get_consumer_pid_path(pid_path: str, consumer_id: int) -> str:
+    """
+    Return pid file path of worker consumer
+    """
+    return f'{pid_path}_{consumer_id}'
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return keep-alive http session of the current consumer, it uses the same proxy as consumer chrome
+    """
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'ru-RU,ru;q=0.9',
+        })
+        if USE_PROXY:
+            proxy = f'{SELENIUM_WORKER_PROXY_IP}:{SELENIUM_WORKER_PROXY_PORT}'
+            session.proxies = {'http': proxy, 'https': proxy}
+        _http_local.session = session
+    return session
+
+
+def fetch_instagram_post_page(post_link: str) -> Optional[dict]:
+    """
+    Download instagram post html and extract post data from embedded shared data json,
+    return None when the page has no post data, e.g. login page was returned
+    """
+    try:
+        response = get_http_session().get(post_link, timeout=SELENIUM_WORKER_HTTP_TIMEOUT)
+    except requests.RequestException:
+        logger.warning(f'can not download instagram post {post_link}', exc_info=True)
+        return None
+    if response.status_code != 200:
+        logger.warning(f'instagram post {post_link} response status: {response.status_code}')
+        return None
+
+    match = INSTAGRAM_SHARED_DATA_RE.search(response.text)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))['entry_data']['PostPage'][0]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
 
 
 def create_vhost_if_not_exist():
@@ -45,15 +114,44 @@ def create_vhost_if_not_exist():
     )
 
 
-def save_result(task_hash: str, link: str, data: dict) -> None:
-    with pymongo.MongoClient('mongodb://mongo', 27017) as mongo_client:
-        mongo_db = mongo_client['owl_project']['selenium_compare']
-        mongo_db.insert_one({
-            'task_hash': task_hash,
-            'link': link,
-            'result': data,
-            'datetime': datetime.datetime.now()
-        })
+@lru_cache(maxsize=None)
+def get_mongo_client() -> pymongo.MongoClient:
+    """
+    Return mongo client shared by all consumers of worker process
+    """
+    return pymongo.MongoClient('mongodb://mongo', 27017)
+
+
+def get_results_collection() -> 'Collection':
+    return get_mongo_client()['owl_project']['selenium_compare']
+
+
+def get_summary_collection() -> 'Collection':
+    """
+    Collection of batch tasks summaries, one document per task hash
+    """
+    return get_mongo_client()['owl_project']['selenium_compare_summary']
+
+
+def start_batch_summary(task_hash: str, total: int) -> None:
+    get_summary_collection().update_one(
+        {'task_hash': task_hash},
+        {'$set': {'task_hash': task_hash, 'total': total, 'finished': False, 'datetime': datetime.datetime.now()}},
+        upsert=True
+    )
+
+
+def save_batch_summary(summary: dict) -> None:
+    get_summary_collection().update_one({'task_hash': summary['task_hash']}, {'$set': summary}, upsert=True)
+
+
+def get_result_document(task_hash: str, link: str, data: dict) -> dict:
+    return {
+        'task_hash': task_hash,
+        'link': link,
+        'result': data,
+        'datetime': datetime.datetime.now()
+    }
 
 
 def get_compare_data(
@@ -0,0 +1,81 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from selenium_parsers.worker.metrics import SAVE_SECONDS
+
+if TYPE_CHECKING:
+    from pymongo.collection import Collection
+
+logger = logging.getLogger('selenium_worker')
+
+Callback = Optional[Callable[[], None]]
+
+
+class ResultsWriter:
+    """
+    Buffer worker results and write them to mongo by insert_many batches,
+    buffer is flushed when it is full, by timer and on close
+    """
+    def __init__(self, collection: 'Collection', batch_size: int, flush_interval: float):
+        self._collection = collection
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._buffer: List[Tuple[dict, Callback, Callback]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='results-writer', daemon=True)
+
+    def start(self) -> None:
+        self._flusher.start()
+
+    def write(self, document: dict, on_saved: Callback = None, on_failed: Callback = None) -> None:
+        """
+        Add document to the buffer, callbacks are called after the document batch was written
+        """
+        with self._lock:
+            self._buffer.append((document, on_saved, on_failed))
+            is_full = len(self._buffer) >= self._batch_size
+        if is_full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write buffered documents, return count of saved documents
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+
+        failed_indexes = set()
+        try:
+            with SAVE_SECONDS.time():
+                self._collection.insert_many([document for document, _, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {error['index'] for error in e.details['writeErrors']}
+            logger.error(f'{len(failed_indexes)} of {len(batch)} results were not saved', exc_info=True)
+        except PyMongoError:
+            failed_indexes = set(range(len(batch)))
+            logger.error(f'results batch of {len(batch)} documents was not saved', exc_info=True)
+
+        for i, (_, on_saved, on_failed) in enumerate(batch):
+            callback = on_failed if i in failed_indexes else on_saved
+            if callback:
+                callback()
+        return len(batch) - len(failed_indexes)
+
+    def _flush_periodically(self) -> None:
+        while not self._stop_event.wait(self._flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """
+        Stop timer and write the rest of buffer
+        """
+        self._stop_event.set()
+        if self._flusher.is_alive():
+            self._flusher.join()
+        self.flush()